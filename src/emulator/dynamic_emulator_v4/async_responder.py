@@ -0,0 +1,364 @@
+import sys
+import time
+import asyncio
+import argparse
+import csv
+import can
+import multiprocessing
+from collections import deque
+from datetime import datetime
+
+from pid_table import REQUEST_ID, RESPONSE_ID, request_filters
+from ramp_pids import PID_MAP, build_table, generators, raw_to_value
+from value_provider import ValueProvider
+from value_plane import ValuePlane
+from value_generator import run_generator
+from timing_stats import print_turnaround
+from stream_log import StreamLog
+from metrics import Metrics
+from wire_tap import WireTap
+import realtime
+from raw_can import RawCanBus
+from faults import FaultInjector
+from capture import BusCapture, FORMATS
+
+# Event-driven variant of dynamic_emulator_v2/test22_10min.py: requests are answered
+# from the Notifier callback as soon as they arrive, pacing is a per-request deadline.
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--channel", default="can0")
+parser.add_argument("--interface", default="socketcan")
+parser.add_argument("--minutes", type=float, default=10, help="Ramp duration")
+parser.add_argument("--response-delay-ms", type=float, default=0, help="Answer this long after the request arrived")
+parser.add_argument("--min-gap-ms", type=float, default=0, help="Minimum spacing between two responses (test22 used 30 ms)")
+parser.add_argument("--no-request-timeout", type=float, default=120)
+parser.add_argument("--split", action="store_true",
+                    help="Generate values in a separate process, read them from shared memory")
+parser.add_argument("--noise", type=float, default=0.0, help="Relative Gaussian noise added by the generator (--split)")
+parser.add_argument("--prefix", default="test_21", help="Output names: <prefix>_*.csv, <prefix>_requests_*.log")
+parser.add_argument("--metrics-port", type=int, default=0,
+                    help="Prometheus text on /metrics at this port, e.g. 9108 (default 0: off)")
+parser.add_argument("--wire-tap", action="store_true",
+                    help="SocketCAN only: measure turnaround from kernel/hardware frame timestamps")
+parser.add_argument("--realtime", action="store_true",
+                    help="GC only in idle windows, mlockall, bigger socket buffers; jitter probe before/after")
+parser.add_argument("--cpus", help="--realtime: pin the process to these CPUs, e.g. 2,3")
+parser.add_argument("--fifo", type=int, help="--realtime: SCHED_FIFO priority (1-99)")
+parser.add_argument("--sockbuf", type=int, default=1 << 20, help="--realtime: SO_RCVBUF/SO_SNDBUF bytes")
+parser.add_argument("--jitter-probe-sec", type=float, default=2.0, help="--realtime: length of each jitter probe")
+parser.add_argument("--raw", action="store_true",
+                    help="SocketCAN only: batched raw-socket receive instead of python-can")
+parser.add_argument("--fault-delay", help="Reply delay distribution in ms: fixed:20, uniform:10:50, normal:30:5, exp:20")
+parser.add_argument("--fault-drop", help="Drop probability per PID: 0C=0.1,*=0.01")
+parser.add_argument("--fault-duplicate", type=float, default=0.0, help="Probability of sending a reply twice")
+parser.add_argument("--fault-stall", help="Bursty stalls, mean_interval_s:duration_ms, e.g. 30:2000")
+parser.add_argument("--fault-stall-mode", choices=["drop", "hold"], default="drop",
+                    help="Replies during a stall are lost, or held until it ends")
+parser.add_argument("--fault-seed", type=int, help="Reproducible fault sequence")
+parser.add_argument("--capture", choices=FORMATS, help="Record all bus traffic to <prefix>_capture_*.blf/.asc")
+parser.add_argument("--flush-sec", type=float, default=1.0, help="Request/response log flush interval")
+args = parser.parse_args()
+
+max_runtime_sec = args.minutes * 60
+tick_sec = 0.08  # scenario resolution, test22's cycle_duration_sec
+total_ticks = int(max_runtime_sec / tick_sec)
+response_delay_sec = args.response_delay_ms / 1000
+min_gap_sec = args.min_gap_ms / 1000
+GENERATOR_START_SEC = 10  # --split: the value process must write its first tick by then
+
+pid_stats = {pid: {"count": 0, "min": float('inf'), "max": float('-inf')} for pid in PID_MAP}
+request_log = None  # stream_log.StreamLog, opened in __main__ or by the caller of run()
+turnarounds = deque(maxlen=100000)  # percentiles over the most recent responses
+responder = None
+metrics = Metrics(PID_MAP)
+wire_tap = None  # wire_tap.WireTap when --wire-tap is given
+gc_window = None  # realtime.GcWindow when --realtime is given
+faults = None  # faults.FaultInjector when any --fault-* option is given
+
+
+class Responder:
+    def __init__(self, bus, loop, start_time, plane=None):
+        self.bus = bus
+        self.loop = loop
+        self.start_time = start_time
+        if plane is not None:
+            self.provider = plane
+        else:
+            self.provider = ValueProvider(generators(total_ticks), self.tick)
+        self.table = build_table(self.provider, RESPONSE_ID)
+        self.next_free = 0.0
+        self.last_request_time = time.time()
+
+    def tick(self):
+        return int((time.time() - self.start_time) / tick_sec)
+
+    def on_request(self, msg):
+        if msg.arbitration_id != REQUEST_ID or len(msg.data) < 3 or msg.data[1] != 0x01:
+            return
+        pid = msg.data[2]
+        now = time.time()
+        self.last_request_time = now
+        if request_log is not None:
+            request_log.request(now - self.start_time, pid)
+        metrics.request(pid, "ramp")
+        response = self.table.respond(0x01, pid)
+        if response is None:
+            return
+        rx_time = msg.timestamp or now
+        raw = self.table.value_of(response)
+        if faults is None and not response_delay_sec and not min_gap_sec:
+            self.send(response, pid, raw, rx_time)
+            return
+        plan = faults.plan(pid, rx_time) if faults else [0.0]
+        if not plan:
+            return
+        # deadline relative to the kernel receive time, never earlier than the gap allows
+        due = max(rx_time + response_delay_sec + plan[0], self.next_free)
+        self.next_free = due + min_gap_sec
+        snapshot = can.Message(arbitration_id=response.arbitration_id, data=bytes(response.data), is_extended_id=False)
+        for offset in plan:
+            # an injected duplicate keeps its gap behind the first copy
+            delay = due + offset - plan[0] - time.time()
+            if delay <= 0:
+                self.send(snapshot, pid, raw, rx_time)
+            else:
+                self.loop.call_later(delay, self.send, snapshot, pid, raw, rx_time)
+
+    def send(self, response, pid, raw, rx_time):
+        self.bus.send(response)
+        now = time.time()
+        turnarounds.append(now - rx_time)
+        metrics.observe(pid, now - rx_time, "ramp")
+        if request_log is not None:
+            request_log.response(now - self.start_time, pid, raw)
+        value = raw_to_value(pid, raw)
+        stats = pid_stats[pid]
+        stats["count"] += 1
+        stats["min"] = min(stats["min"], value)
+        stats["max"] = max(stats["max"], value)
+
+
+async def run(bus, plane=None):
+    global responder
+    loop = asyncio.get_running_loop()
+    start_time = time.time()
+    responder = Responder(bus, loop, start_time, plane)
+    raw = isinstance(bus, RawCanBus)
+    if raw:
+        loop.add_reader(bus.fileno(), on_raw_readable, bus)
+    else:
+        reader = can.AsyncBufferedReader()
+        notifier = can.Notifier(bus, [reader], loop=loop)
+    try:
+        while True:
+            elapsed = time.time() - start_time
+            if elapsed >= max_runtime_sec:
+                print("Async emulator complete.")
+                break
+            if time.time() - responder.last_request_time > args.no_request_timeout:
+                print(f"No requests received in the last {args.no_request_timeout:.0f} s. Aborting test.")
+                break
+            if raw:
+                await asyncio.sleep(1.0)  # frames are handled by on_raw_readable
+                continue
+            try:
+                msg = await asyncio.wait_for(reader.get_message(), timeout=1.0)
+            except asyncio.TimeoutError:
+                if gc_window:
+                    gc_window.idle()
+                continue
+            responder.on_request(msg)
+            if gc_window and reader.buffer.empty():
+                gc_window.idle()
+        # let responses already scheduled by deadline go out
+        await asyncio.sleep(response_delay_sec + min_gap_sec)
+    finally:
+        if raw:
+            loop.remove_reader(bus.fileno())
+        else:
+            notifier.stop()
+
+def wait_for_generator(plane, generator, timeout):
+    # None once the value process wrote its first tick, else the exit code to leave with
+    deadline = time.monotonic() + timeout
+    while plane.tick() == 0:
+        if not generator.is_alive():
+            code = generator.exitcode
+            print(f"Value generator exited with code {code} before its first tick.")
+            return 128 - code if code < 0 else code or 1  # killed by a signal: 128 + signum, like a shell
+        if time.monotonic() > deadline:
+            print(f"Value generator wrote no tick within {timeout:g} s, giving up.")
+            return 1
+        time.sleep(0.01)
+    return None
+
+def on_raw_readable(bus):
+    # one wake-up, every queued request
+    for msg in bus.messages(bus.drain()):
+        responder.on_request(msg)
+    if gc_window:
+        gc_window.idle()
+
+
+def ms(histogram, q=None):
+    if histogram is None or not histogram.count:
+        return 'N/A'
+    return round((histogram.max if q is None else histogram.percentile(q)) * 1000, 3)
+
+def write_summary(csv_filename, reqlog_filename, metrics_filename=None):
+    # App*: receive timestamp -> after bus.send(); Wire*: request and reply frame timestamps
+    source = wire_tap.source() if wire_tap else 'none'
+    print("\n=== PID Query Summary ===")
+    with open(csv_filename, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["PID", "Name", "Count", "MinValue", "MaxValue", "AppP50Ms", "AppP99Ms",
+                         "WireP50Ms", "WireP99Ms", "WireMaxMs", "TimestampSource"])
+        for pid, stats in pid_stats.items():
+            name = PID_MAP[pid]
+            count = stats["count"]
+            min_v = round(stats["min"], 2) if count else 'N/A'
+            max_v = round(stats["max"], 2) if count else 'N/A'
+            app = metrics.latency.get((pid, "ramp"))
+            wire = wire_tap.histograms.get(pid) if wire_tap else None
+            print(f"{pid:02X} ({name}): Count={count}, Range=[{min_v}, {max_v}], "
+                  f"app p99={ms(app, 99)} ms, wire p99={ms(wire, 99)} ms")
+            writer.writerow([f"{pid:02X}", name, count, min_v, max_v, ms(app, 50), ms(app, 99),
+                             ms(wire, 50), ms(wire, 99), ms(wire), source])
+
+    if request_log is not None:
+        request_log.close()
+        request_log.export_text(reqlog_filename, PID_MAP, remove_segments=True)
+        if request_log.dropped:
+            print(f"Request log: {request_log.dropped} records dropped (writer fell behind)")
+
+    if isinstance(getattr(responder, "provider", None), ValueProvider):
+        responder.provider.print_counters(PID_MAP, responder.tick())
+
+    print("\n=== Request -> response turnaround ===")
+    print_turnaround(f"last {len(turnarounds)} responses", turnarounds)
+    if wire_tap:
+        print(f"Wire turnaround from {source} timestamps, {wire_tap.unmatched} replies without a request, "
+              f"{wire_tap.mixed} pairs skipped (request and reply from different clocks)")
+    print(f"\nCSV summary written to {csv_filename}")
+    if request_log is not None:
+        print(f"Request log written to {reqlog_filename}")
+    if metrics_filename:
+        metrics.snapshot(metrics_filename)
+        print(f"Metrics snapshot written to {metrics_filename}")
+
+
+if __name__ == "__main__":
+    if args.raw:
+        bus = RawCanBus(args.channel, [(REQUEST_ID, 0x7FF)])
+    else:
+        # Responder only answers functional requests; same filter as the raw path
+        bus = can.Bus(channel=args.channel, interface=args.interface, can_filters=request_filters(None))
+    plane = None
+    generator = None
+    stop = multiprocessing.Event()
+    if args.split:
+        # before any log, capture or tap is opened, so a generator that never starts leaves nothing behind
+        plane = ValuePlane(create=True)
+        generator = multiprocessing.Process(target=run_generator, daemon=True,
+                                            args=(plane.name, tick_sec, total_ticks, stop, args.noise))
+        generator.start()
+        exit_code = wait_for_generator(plane, generator, GENERATOR_START_SEC)
+        if exit_code is not None:
+            stop.set()
+            generator.join(timeout=2)
+            if generator.is_alive():
+                generator.terminate()
+            plane.close()
+            bus.shutdown()
+            sys.exit(exit_code)
+        print(f"Value generator running in process {generator.pid}, shared memory {plane.name}.")
+    timestamp = datetime.now()
+    csv_filename = timestamp.strftime(f'{args.prefix}_%d_%m_%H_%M.csv')
+    reqlog_filename = timestamp.strftime(f'{args.prefix}_requests_%d_%m_%H_%M.log')
+    metrics_filename = timestamp.strftime(f'{args.prefix}_metrics_%d_%m_%H_%M.json')
+    if args.fault_delay or args.fault_drop or args.fault_duplicate or args.fault_stall:
+        faults = FaultInjector(args.fault_delay, args.fault_drop, args.fault_duplicate, stall=args.fault_stall,
+                               stall_mode=args.fault_stall_mode, seed=args.fault_seed,
+                               log_path=timestamp.strftime(f'{args.prefix}_faults_%d_%m_%H_%M.log'))
+    # streamed to <log>.NNNNN.bin while running, converted to the text log at the end
+    request_log = StreamLog(reqlog_filename[:-len(".log")], flush_interval=args.flush_sec)
+    print(f"Async emulator: starting at {timestamp.strftime('%Y-%m-%d %H:%M:%S')} on {args.channel}. "
+          f"Duration: {args.minutes:g} minutes.")
+    capture = None
+    if args.capture:
+        capture = BusCapture(args.channel, args.interface,
+                             timestamp.strftime(f'{args.prefix}_capture_%d_%m_%H_%M.{args.capture}'))
+    if args.wire_tap:
+        wire_tap = WireTap(args.channel)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+        print(f"Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+    if args.realtime:
+        # after the generator fork, so the value process keeps the default scheduling
+        before = realtime.measure_jitter(args.jitter_probe_sec)
+        cpus = {int(cpu) for cpu in args.cpus.split(",")} if args.cpus else None
+        for line in realtime.apply(cpus, args.fifo, getattr(bus, "socket", None), args.sockbuf, mlock=True):
+            print(f"Real-time mode, {line}")
+        gc_window = realtime.GcWindow()
+        gc_window.start()
+        after = realtime.measure_jitter(args.jitter_probe_sec, idle=gc_window.idle)
+        print("Timer wake-up jitter (1 ms period):")
+        realtime.print_jitter("  default", before)
+        realtime.print_jitter("  real-time", after)
+    try:
+        asyncio.run(run(bus, plane))
+    except KeyboardInterrupt:
+        print("Async emulator stopped manually.")
+    finally:
+        if args.raw:
+            print(f"Raw backend: {bus.frames} frames in {bus.wakeups} wake-ups")
+        bus.shutdown()
+        if generator is not None:
+            stop.set()
+            generator.join(timeout=2)
+            print(f"Value plane reader retries: {plane.retries}")
+            plane.close()
+        if wire_tap:
+            wire_tap.close()
+        if capture:
+            capture.stop()
+        if gc_window:
+            gc_window.stop()
+            print(gc_window.report())
+        if faults:
+            faults.close()
+            faults.print_counters()
+        write_summary(csv_filename, reqlog_filename, metrics_filename)
+
+
+"""
+Turnaround on vcan:
+    sudo ip link add dev vcan0 type vcan && sudo ip link set up vcan0
+    python3 async_responder.py --channel vcan0 --minutes 2 &
+    python3 probe_turnaround.py --channel vcan0 --count 2000
+
+Reproduce the old 30 ms spacing without blocking the receive path:
+    python3 async_responder.py --min-gap-ms 30
+
+Value generation in its own process, 2 % noise, responder reads shared memory only:
+    python3 async_responder.py --split --noise 0.02
+
+Turnaround from kernel (or controller) frame timestamps, next to the user-space figure:
+    python3 async_responder.py --channel can0 --wire-tap
+
+Real-time mode on an isolated core (SCHED_FIFO and mlockall need root or CAP_SYS_NICE/CAP_IPC_LOCK):
+    sudo python3 async_responder.py --realtime --cpus 3 --fifo 50
+
+Batched raw-socket receive (compare CPU per request with bench_rx.py):
+    python3 async_responder.py --channel vcan0 --raw
+
+Sweep the device's timeouts: 10-50 ms reply delay, 5 % of RPM replies lost, a 2 s stall
+about every 30 s (all logged to test_21_faults_*.log):
+    python3 async_responder.py --fault-delay uniform:10:50 --fault-drop 0C=0.05 --fault-stall 30:2000
+
+Capture the whole bus next to the run (instead of candump in a second terminal):
+    python3 async_responder.py --capture blf
+
+After a crash the streamed segments are still on disk; rebuild the text log with:
+    python3 stream_log.py test_21_requests_25_05_18_04
+"""
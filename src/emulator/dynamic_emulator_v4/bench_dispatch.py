@@ -0,0 +1,99 @@
+import time
+import random
+import argparse
+import can
+
+from fmc_pids import build_table, get_phase, FMC003_POLL_SEQUENCE
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--iterations", type=int, default=100000, help="Requests per path")
+args = parser.parse_args()
+
+# v0 path: globals() lookup by formatted name, list built by resp(), new can.Message per reply
+def resp(tag, pid, payload):
+    response = [len(payload) + 2, 0x41, pid] + payload
+    if len(response) < 8:
+        response += [0x00] * (8 - len(response))
+    return response
+
+def pid_05():
+    temp = random.randint(50, 90)
+    return resp(0xAA, 0x05, [(temp + 1) % 100])
+
+def pid_0C():
+    rpm = {'low': random.randint(4000, 6000), 'medium': random.randint(6000, 12000), 'high': random.randint(12000, 20000)}[get_phase()]
+    return resp(0xAA, 0x0C, [(rpm >> 8) & 0xFF, rpm & 0xFF])
+
+def pid_0D():
+    speed = {'low': random.randint(0, 20), 'medium': random.randint(20, 60), 'high': random.randint(60, 100)}[get_phase()]
+    return resp(0xAA, 0x0D, [speed])
+
+def pid_1F():
+    runtime = {'low': random.randint(16, 200), 'medium': random.randint(200, 600), 'high': random.randint(600, 1000)}[get_phase()]
+    return resp(0xAA, 0x1F, [(runtime >> 8) & 0xFF, runtime & 0xFF])
+
+def pid_21():
+    distance = {'low': random.randint(0, 3), 'medium': random.randint(3, 10), 'high': random.randint(10, 30)}[get_phase()]
+    return resp(0xAA, 0x21, [(distance >> 8) & 0xFF, distance & 0xFF])
+
+def pid_31(): return resp(0xAA, 0x31, [random.randint(1, 20)])
+def pid_42(): return resp(0xAA, 0x42, [random.randint(110, 140)])
+def pid_46():
+    temp = {'low': random.randint(90, 100), 'medium': random.randint(60, 90), 'high': random.randint(40, 60)}[get_phase()]
+    return resp(0xAA, 0x46, [temp])
+def pid_4E():
+    rate = random.randint(0, 400)
+    return resp(0xAA, 0x4E, [(rate >> 8) & 0xFF, rate & 0xFF])
+def pid_06(): return resp(0xAA, 0x06, [0x00])
+def pid_0A(): return resp(0xAA, 0x0A, [0x0C])
+def pid_0B(): return resp(0xAA, 0x0B, [0x3C])
+def pid_0E(): return resp(0xAA, 0x0E, [0x1E])
+def pid_0F(): return resp(0xAA, 0x0F, [70])
+def pid_10(): return resp(0xAA, 0x10, [0x04, 0x1A])
+def pid_11(): return resp(0xAA, 0x11, [90])
+def pid_22(): return resp(0xAA, 0x22, [0x01, 0x02])
+def pid_23(): return resp(0xAA, 0x23, [0x55, 0x55])
+def pid_2C(): return resp(0xAA, 0x2C, [0x01])
+def pid_2D(): return resp(0xAA, 0x2D, [0x20])
+def pid_2F(): return resp(0xAA, 0x2F, [57])
+def pid_33(): return resp(0xAA, 0x33, [0x00, 0x01])
+def pid_43(): return resp(0xAA, 0x43, [0x01])
+def pid_44(): return resp(0xAA, 0x44, [0x00, 0xC8])
+def pid_47(): return resp(0xAA, 0x47, [28])
+def pid_4D(): return resp(0xAA, 0x4D, [0x10])
+def pid_51(): return resp(0xAA, 0x51, [0x40])
+def pid_52(): return resp(0xAA, 0x52, [0x01, 0x00])
+def pid_59(): return resp(0xAA, 0x59, [0x00, 0x01])
+def pid_5B(): return resp(0xAA, 0x5B, [0x00])
+def pid_5C(): return resp(0xAA, 0x5C, [0x00])
+def pid_5D(): return resp(0xAA, 0x5D, [0x00])
+def pid_5E(): return resp(0xAA, 0x5E, [0x00])
+
+def legacy_respond(mode, pid):
+    handler = globals().get(f"pid_{pid:02X}")
+    if handler:
+        return can.Message(arbitration_id=0x7E8, data=handler()[:8], is_extended_id=False)
+    return None
+
+def run(label, respond, requests):
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    for mode, pid in requests:
+        respond(mode, pid)
+    cpu = time.process_time() - start_cpu
+    wall = time.perf_counter() - start_wall
+    n = len(requests)
+    print(f"{label:<10} {n / wall:>12,.0f} frames/s   {cpu / n * 1e6:>7.2f} us CPU/response")
+    return cpu / n
+
+
+requests = [(0x01, FMC003_POLL_SEQUENCE[i % len(FMC003_POLL_SEQUENCE)]) for i in range(args.iterations)]
+table = build_table()
+
+# warm up both paths before timing
+run("warmup", legacy_respond, requests[:1000])
+run("warmup", table.respond, requests[:1000])
+print(f"\n=== Dispatch benchmark: {args.iterations} requests, FMC003 poll order ===")
+legacy_cpu = run("v0 path", legacy_respond, requests)
+table_cpu = run("PidTable", table.respond, requests)
+print(f"Speedup: {legacy_cpu / table_cpu:.1f}x CPU per response")
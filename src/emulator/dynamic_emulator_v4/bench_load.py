@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import subprocess
+from collections import deque
+from datetime import datetime
+
+import can
+
+from pid_table import REQUEST_ID, RESPONSE_ID
+from fmc_pids import build_table, FMC003_POLL_SEQUENCE, VIN
+from obd_server import ObdServer
+from timers import TimerQueue
+from timing_stats import summarize
+
+# Load generator for the responders: open-loop mode 01 requests at a stepped rate, with a
+# configurable PID mix and arrival pattern, and per step the sustained reply rate, drop
+# rate and turnaround percentiles. Results go to JSON so runs can be compared (--compare).
+# Requests are matched to replies per PID in FIFO order; a reply after --timeout-ms is
+# late, a request without any reply by then is dropped.
+#   in-process fmc_pids responder on a virtual bus (baseline of the harness itself):
+#     python3 bench_load.py --rates 100,500,1000,2000
+#   an emulator already running on vcan0 (dynamic_emulator.py, test22_10min.py, ...):
+#     python3 bench_load.py --external --channel vcan0 --interface socketcan --rates 50,100,200,400,800
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--channel", default="bench")
+parser.add_argument("--interface", default="virtual", help="virtual (in-process) or socketcan")
+parser.add_argument("--external", action="store_true", help="Drive a responder already running on --channel")
+parser.add_argument("--rates", default="50,100,200,500,1000", help="Offered requests/s, one step each")
+parser.add_argument("--step-sec", type=float, default=10)
+parser.add_argument("--mix", default="fmc",
+                    help="'fmc' (captured FMC003 order) or weighted hex PIDs, e.g. 0C:4,0D:2,05:1")
+parser.add_argument("--arrival", choices=["fixed", "poisson"], default="fixed")
+parser.add_argument("--burst", type=int, default=1, help="Requests sent back to back per arrival")
+parser.add_argument("--timeout-ms", type=float, default=100, help="Later replies count as late")
+parser.add_argument("--max-drop", type=float, default=0.001, help="Sustainable: drop rate at most this")
+parser.add_argument("--max-p99-ms", type=float, default=50, help="Sustainable: p99 turnaround at most this")
+parser.add_argument("--seed", type=int, default=1)
+parser.add_argument("--label", default="", help="Free text stored with the results")
+parser.add_argument("--output", default=None, help="JSON path (default: bench_load_<date>.json)")
+parser.add_argument("--compare", default=None, help="Earlier JSON result to print deltas against")
+args = parser.parse_args()
+
+
+def pid_mix(spec, seed, size=4096):
+    # a fixed, seeded request sequence; the generator walks it in a loop
+    if spec == "fmc":
+        return list(FMC003_POLL_SEQUENCE)
+    weights = {int(pid, 16): float(weight) for pid, weight in (item.split(":") for item in spec.split(","))}
+    return random.Random(seed).choices(list(weights), list(weights.values()), k=size)
+
+def serve(stop):
+    bus = can.Bus(channel=args.channel, interface=args.interface)
+    timers = TimerQueue()
+    server = ObdServer(bus, build_table(RESPONSE_ID, seed=args.seed), VIN, timers.call_later)
+    while not stop.is_set():
+        msg = bus.recv(timeout=timers.timeout(0.05))
+        if msg:
+            server.on_message(msg)
+        timers.run_due()
+    bus.shutdown()
+
+
+class LoadStep:
+    def __init__(self, rate, pids, seconds, timeout):
+        self.rate = rate
+        self.pids = pids
+        self.seconds = seconds
+        self.timeout = timeout
+        self.outstanding = [deque() for _ in range(256)]  # send times per PID
+        self.turnarounds = []
+        self.sent = 0
+        self.tx_errors = 0
+        self.replies = 0
+        self.late = 0
+        self.unmatched = 0
+        self.duration = seconds
+
+    def generate(self, bus, rng):
+        msg = can.Message(arbitration_id=REQUEST_ID, data=bytearray([0x02, 0x01, 0, 0, 0, 0, 0, 0]),
+                          is_extended_id=False)
+        mean_gap = args.burst / self.rate
+        pids = self.pids
+        i = 0
+        start = time.perf_counter()
+        next_send = start
+        end = start + self.seconds
+        while next_send < end:
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            for _ in range(args.burst):
+                pid = pids[i % len(pids)]
+                i += 1
+                msg.data[2] = pid
+                self.outstanding[pid].append(time.time())
+                try:
+                    bus.send(msg)
+                    self.sent += 1
+                except can.CanError:
+                    self.outstanding[pid].pop()
+                    self.tx_errors += 1
+            next_send += rng.expovariate(1 / mean_gap) if args.arrival == "poisson" else mean_gap
+        self.duration = time.perf_counter() - start
+
+    def on_reply(self, msg):
+        data = msg.data
+        if len(data) < 3 or data[1] != 0x41:
+            return
+        pending = self.outstanding[data[2]]
+        if not pending:
+            self.unmatched += 1
+            return
+        turnaround = (msg.timestamp or time.time()) - pending.popleft()
+        self.replies += 1
+        if turnaround > self.timeout:
+            self.late += 1
+        else:
+            self.turnarounds.append(turnaround)
+
+    def result(self):
+        dropped = sum(len(pending) for pending in self.outstanding)
+        s = summarize(self.turnarounds)
+        return {
+            "offered_rate": self.rate,
+            "sent": self.sent,
+            "send_rate": round(self.sent / self.duration, 1),
+            "tx_errors": self.tx_errors,
+            "replies": self.replies,
+            "reply_rate": round(len(self.turnarounds) / self.duration, 1),
+            "late": self.late,
+            "dropped": dropped,
+            "drop_rate": round((dropped + self.late) / max(self.sent, 1), 6),
+            "unmatched": self.unmatched,
+            "p50_ms": round(s["p50"] * 1000, 3),
+            "p90_ms": round(s["p90"] * 1000, 3),
+            "p99_ms": round(s["p99"] * 1000, 3),
+            "max_ms": round(s["max"] * 1000, 3),
+        }
+
+
+def run_step(rate, pids, rng):
+    step = LoadStep(rate, pids, args.step_sec, args.timeout_ms / 1000)
+    tx = can.Bus(channel=args.channel, interface=args.interface)
+    rx = can.Bus(channel=args.channel, interface=args.interface,
+                 can_filters=[{"can_id": RESPONSE_ID, "can_mask": 0x7F8, "extended": False}])
+    done = threading.Event()
+
+    def receive():
+        while True:
+            msg = rx.recv(timeout=0.05)
+            if msg is not None:
+                step.on_reply(msg)
+            elif done.is_set():
+                break
+
+    receiver = threading.Thread(target=receive, name="bench-rx", daemon=True)
+    receiver.start()
+    try:
+        step.generate(tx, rng)
+        time.sleep(step.timeout)  # stragglers
+    finally:
+        done.set()
+        receiver.join()
+        tx.shutdown()
+        rx.shutdown()
+    return step.result()
+
+def sustainable(steps):
+    ok = [s["offered_rate"] for s in steps if s["drop_rate"] <= args.max_drop and s["p99_ms"] <= args.max_p99_ms]
+    return max(ok) if ok else None
+
+def revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def print_header():
+    print(f"{'offered/s':>10}{'sent/s':>9}{'replies/s':>10}{'drop %':>8}{'late':>6}"
+          f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+
+def print_step(s):
+    print(f"{s['offered_rate']:>10g}{s['send_rate']:>9.0f}{s['reply_rate']:>10.0f}{s['drop_rate'] * 100:>8.2f}"
+          f"{s['late']:>6}{s['p50_ms']:>9.3f}{s['p90_ms']:>9.3f}{s['p99_ms']:>9.3f}{s['max_ms']:>9.3f}")
+
+def print_comparison(result, path):
+    with open(path) as f:
+        before = json.load(f)
+    old = {s["offered_rate"]: s for s in before["steps"]}
+    print(f"\n=== Against {path} ({before['meta'].get('revision')}, {before['meta'].get('label') or 'no label'}) ===")
+    print(f"{'offered/s':>10}{'replies/s':>12}{'drop %':>14}{'p99 ms':>18}")
+    for s in result["steps"]:
+        o = old.get(s["offered_rate"])
+        if o is None:
+            continue
+        print(f"{s['offered_rate']:>10g}{s['reply_rate'] - o['reply_rate']:>+12.0f}"
+              f"{(s['drop_rate'] - o['drop_rate']) * 100:>+14.2f}{s['p99_ms'] - o['p99_ms']:>+18.3f}")
+    print(f"Sustainable rate: {before.get('sustainable_rate')} -> {result['sustainable_rate']} requests/s")
+
+
+if __name__ == "__main__":
+    rates = [float(r) for r in args.rates.split(",")]
+    pids = pid_mix(args.mix, args.seed)
+    rng = random.Random(args.seed)
+
+    stop = threading.Event()
+    server = None
+    if not args.external:
+        server = threading.Thread(target=serve, args=(stop,), daemon=True)
+        server.start()
+        time.sleep(0.1)
+
+    target = args.channel if args.external else "in-process fmc_pids responder"
+    print(f"\n=== Load: {args.mix} mix, {args.arrival} arrivals, burst {args.burst}, "
+          f"{args.step_sec:g} s per step against {target} ===")
+    print_header()
+    steps = []
+    try:
+        for rate in rates:
+            steps.append(run_step(rate, pids, rng))
+            print_step(steps[-1])
+    except KeyboardInterrupt:
+        print("Benchmark stopped manually.")
+    finally:
+        stop.set()
+        if server:
+            server.join(timeout=2)
+
+    result = {
+        "meta": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "host": socket.gethostname(),
+            "revision": revision(),
+            "label": args.label,
+            "channel": args.channel,
+            "interface": args.interface,
+            "external": args.external,
+            "mix": args.mix,
+            "arrival": args.arrival,
+            "burst": args.burst,
+            "step_sec": args.step_sec,
+            "timeout_ms": args.timeout_ms,
+            "seed": args.seed,
+        },
+        "criteria": {"max_drop": args.max_drop, "max_p99_ms": args.max_p99_ms},
+        "sustainable_rate": sustainable(steps),
+        "steps": steps,
+    }
+    print(f"Sustainable rate (drop <= {args.max_drop * 100:g} %, p99 <= {args.max_p99_ms:g} ms): "
+          f"{result['sustainable_rate']} requests/s")
+    output = args.output or datetime.now().strftime('bench_load_%d_%m_%H_%M.json')
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
+    if args.compare:
+        print_comparison(result, args.compare)
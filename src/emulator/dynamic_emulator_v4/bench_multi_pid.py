@@ -0,0 +1,115 @@
+import time
+import argparse
+import threading
+import can
+
+from pid_table import REQUEST_ID, RESPONSE_ID, PHYSICAL_ID
+from fmc_pids import build_table, FMC003_POLL_SEQUENCE, VIN
+from obd_server import ObdServer, MAX_PIDS_PER_REQUEST
+from isotp import IsoTpReceiver
+from timers import TimerQueue
+
+# One-PID-per-request polling (what the FMC003 does, ~74 ms per PID in canlog.txt)
+# against batched mode 01 requests with up to six PIDs each.
+
+FMC003_PID_INTERVAL_SEC = 0.074
+FRAME_BITS = 135  # 11-bit ID, 8 data bytes, typical bit stuffing
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--channel", default="bench")
+parser.add_argument("--interface", default="virtual", help="virtual (in-process) or socketcan")
+parser.add_argument("--external", action="store_true", help="Poll an emulator already running on --channel")
+parser.add_argument("--cycles", type=int, default=20, help="Polling cycles over the FMC003 PID list")
+parser.add_argument("--bitrate", type=int, default=500000)
+parser.add_argument("--timeout", type=float, default=0.5)
+args = parser.parse_args()
+
+
+def serve(stop):
+    bus = can.Bus(channel=args.channel, interface=args.interface)
+    timers = TimerQueue()
+    server = ObdServer(bus, build_table(RESPONSE_ID), VIN, timers.call_later)
+    while not stop.is_set():
+        msg = bus.recv(timeout=timers.timeout(0.05))
+        if msg:
+            server.on_message(msg)
+        timers.run_due()
+    bus.shutdown()
+
+
+class Tester:
+    def __init__(self):
+        self.bus = can.Bus(channel=args.channel, interface=args.interface)
+        self.timers = TimerQueue()
+        self.receiver = IsoTpReceiver(self.bus, [RESPONSE_ID], PHYSICAL_ID, self.on_payload, self.timers.call_later)
+        self.payload = None
+        self.frames = 0
+
+    def on_payload(self, payload, arbitration_id):
+        self.payload = payload
+
+    def request(self, pids):
+        self.payload = None
+        data = [1 + len(pids), 0x01] + list(pids)
+        self.bus.send(can.Message(arbitration_id=REQUEST_ID, data=data + [0] * (8 - len(data)), is_extended_id=False))
+        self.frames += 1
+        deadline = time.perf_counter() + args.timeout
+        while self.payload is None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            msg = self.bus.recv(timeout=self.timers.timeout(remaining))
+            if msg is not None and msg.arbitration_id == RESPONSE_ID:
+                self.frames += 1
+                if self.receiver.on_message(msg) and msg.data[0] & 0xF0 == 0x10:
+                    self.frames += 1  # our flow control
+            self.timers.run_due()
+        return self.payload
+
+
+def run(tester, batch):
+    groups = [FMC003_POLL_SEQUENCE[i:i + batch] for i in range(0, len(FMC003_POLL_SEQUENCE), batch)]
+    tester.frames = 0
+    missing = 0
+    start = time.perf_counter()
+    for _ in range(args.cycles):
+        for group in groups:
+            if tester.request(group) is None:
+                missing += 1
+    elapsed = (time.perf_counter() - start) / args.cycles
+    frames = tester.frames / args.cycles
+    return {
+        "round_trips": len(groups),
+        "frames": frames,
+        "bus_ms": frames * FRAME_BITS / args.bitrate * 1000,
+        "wall_ms": elapsed * 1000,
+        "fmc_ms": len(groups) * FMC003_PID_INTERVAL_SEC * 1000,
+        "missing": missing,
+    }
+
+
+stop = threading.Event()
+server_thread = None
+if not args.external:
+    server_thread = threading.Thread(target=serve, args=(stop,), daemon=True)
+    server_thread.start()
+    time.sleep(0.1)
+
+tester = Tester()
+try:
+    single = run(tester, 1)
+    batched = run(tester, MAX_PIDS_PER_REQUEST)
+finally:
+    stop.set()
+    tester.bus.shutdown()
+    if server_thread:
+        server_thread.join()
+
+print(f"\n=== Polling cycle over {len(FMC003_POLL_SEQUENCE)} FMC003 PIDs ({args.cycles} cycles, {args.interface}) ===")
+print(f"{'':<16}{'round trips':>12}{'frames':>9}{'bus ms':>9}{'wall ms':>10}{'@74ms/req':>11}{'missing':>9}")
+for label, r in (("1 PID/request", single), (f"{MAX_PIDS_PER_REQUEST} PIDs/request", batched)):
+    print(f"{label:<16}{r['round_trips']:>12}{r['frames']:>9.0f}{r['bus_ms']:>9.2f}{r['wall_ms']:>10.2f}"
+          f"{r['fmc_ms']:>11.0f}{r['missing']:>9}")
+print(f"Round trips saved per cycle: {single['round_trips'] - batched['round_trips']}, "
+      f"bus time saved: {single['bus_ms'] - batched['bus_ms']:.2f} ms, "
+      f"at FMC003 pacing: {(single['fmc_ms'] - batched['fmc_ms']) / 1000:.2f} s per cycle")
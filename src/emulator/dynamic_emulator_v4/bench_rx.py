@@ -0,0 +1,114 @@
+import time
+import argparse
+import multiprocessing
+import can
+
+from pid_table import REQUEST_ID, RESPONSE_ID, request_filters
+from raw_can import RawCanBus
+
+# Receive-path cost on a busy bus: a separate process floods the channel with unrelated
+# traffic plus our own 0x7E8 replies, with 0x7DF requests mixed in. Every receiver
+# answers nothing, it only counts requests, so CPU per handled request is pure receive cost.
+#   python-can        every frame reaches Python, non-requests discarded there (the old loops)
+#   python-can+filter can_filters, the kernel drops everything but requests
+#   raw batched       raw_can.RawCanBus: kernel filters, drain the socket per wake-up
+# Needs SocketCAN: sudo ip link add dev vcan0 type vcan && sudo ip link set up vcan0
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--channel", default="vcan0")
+parser.add_argument("--interface", default="socketcan", help="python-can interface; the raw case needs socketcan")
+parser.add_argument("--seconds", type=float, default=5, help="Per receiver")
+parser.add_argument("--frames-per-sec", type=int, default=8000, help="Total offered load")
+parser.add_argument("--request-share", type=float, default=0.05, help="Fraction of frames that are 0x7DF requests")
+parser.add_argument("--burst", type=int, default=20, help="Frames sent back to back per sender wake-up")
+args = parser.parse_args()
+
+
+def flood(stop, channel, interface):
+    bus = can.Bus(channel=channel, interface=interface)
+    every = max(1, round(1 / args.request_share)) if args.request_share else 0
+    period = args.burst / args.frames_per_sec
+    request = can.Message(arbitration_id=REQUEST_ID, data=[0x02, 0x01, 0x0C, 0, 0, 0, 0, 0], is_extended_id=False)
+    reply = can.Message(arbitration_id=RESPONSE_ID, data=[0x04, 0x41, 0x0C, 0x1A, 0xF8, 0, 0, 0], is_extended_id=False)
+    other = [can.Message(arbitration_id=can_id, data=bytes(8), is_extended_id=False)
+             for can_id in (0x100, 0x280, 0x3E9, 0x5A0, 0x6F1)]
+    n = 0
+    next_burst = time.perf_counter()
+    while not stop.is_set():
+        for _ in range(args.burst):
+            n += 1
+            if every and n % every == 0:
+                msg = request
+            elif n % 3 == 0:
+                msg = reply
+            else:
+                msg = other[n % len(other)]
+            try:
+                bus.send(msg)
+            except can.CanError:
+                pass  # saturated: that is the point
+        next_burst += period
+        delay = next_burst - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    bus.shutdown()
+
+
+def python_can_loop(bus, deadline):
+    handled = wakeups = frames = 0
+    while time.monotonic() < deadline:
+        msg = bus.recv(timeout=0.1)
+        if msg is None:
+            continue
+        wakeups += 1
+        frames += 1
+        if msg.arbitration_id == REQUEST_ID and len(msg.data) >= 3 and msg.data[1] == 0x01:
+            handled += 1
+    return handled, wakeups, frames
+
+def raw_loop(bus, deadline):
+    handled = 0
+    while time.monotonic() < deadline:
+        for msg in bus.messages(bus.recv_batch(0.1)):
+            if msg.arbitration_id == REQUEST_ID and len(msg.data) >= 3 and msg.data[1] == 0x01:
+                handled += 1
+    return handled, bus.wakeups, bus.frames
+
+def measure(label, open_bus, loop):
+    bus = open_bus()
+    time.sleep(0.2)  # let the receive queue reach steady state
+    cpu_start = time.process_time()
+    start = time.monotonic()
+    handled, wakeups, frames = loop(bus, start + args.seconds)
+    cpu = time.process_time() - cpu_start
+    bus.shutdown()
+    per_request = cpu / handled * 1e6 if handled else float('nan')
+    print(f"{label:<20}{handled:>10}{frames:>10}{wakeups:>10}{wakeups / max(handled, 1):>12.2f}"
+          f"{cpu / args.seconds * 100:>8.1f}%{per_request:>12.1f}")
+    return per_request
+
+
+if __name__ == "__main__":
+    cases = [
+        ("python-can", lambda: can.Bus(channel=args.channel, interface=args.interface), python_can_loop),
+        ("python-can+filter", lambda: can.Bus(channel=args.channel, interface=args.interface,
+                                              can_filters=request_filters()), python_can_loop),
+    ]
+    if args.interface == "socketcan":
+        cases.append(("raw batched", lambda: RawCanBus(args.channel), raw_loop))
+
+    stop = multiprocessing.Event()
+    sender = multiprocessing.Process(target=flood, args=(stop, args.channel, args.interface), daemon=True)
+    sender.start()
+    try:
+        print(f"\n=== Receive cost: {args.frames_per_sec} frames/s offered, "
+              f"{args.request_share * 100:g} % requests, {args.seconds:g} s per receiver ===")
+        print(f"{'':<20}{'requests':>10}{'frames':>10}{'wake-ups':>10}{'wake/req':>12}{'CPU':>9}{'us CPU/req':>12}")
+        results = {label: measure(label, open_bus, loop) for label, open_bus, loop in cases}
+    finally:
+        stop.set()
+        sender.join(timeout=2)
+    baseline = results["python-can"]
+    for label, per_request in results.items():
+        if label != "python-can":
+            print(f"{label}: {baseline / per_request:.1f}x less CPU per request than unfiltered python-can")
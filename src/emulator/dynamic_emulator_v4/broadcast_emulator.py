@@ -0,0 +1,182 @@
+import csv
+import time
+import argparse
+import can
+from datetime import datetime
+
+from pid_table import RESPONSE_ID
+import scenario_compiler
+from deadline_scheduler import DeadlineScheduler, CATCH_UP, SKIP
+from tx_queue import TxQueue
+from sim_clock import RealClock, SimClock, SimNetwork
+
+# One engine for the broadcast-style scripts (scenarios/*.json): frames are precompiled by
+# scenario_compiler and go out on absolute deadlines, so an "80 ms" cycle really lasts 80 ms.
+# With --simulate the same loop runs on a simulated clock and bus: a multi-hour scenario
+# finishes in seconds and leaves its frame timeline and per-PID summary as CSV.
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--scenario", default="test24", help="Name in scenarios/ or path to a scenario file")
+parser.add_argument("--dtc", type=int, choices=[0, 1, 2, 3], default=None, help="Number of DTCs (test23)")
+parser.add_argument("--channel", default="can0")
+parser.add_argument("--interface", default="socketcan")
+parser.add_argument("--policy", choices=[SKIP, CATCH_UP], default=SKIP, help="What to do with missed cycles")
+parser.add_argument("--bcm", action="store_true", help="Let the kernel (CAN_BCM) send the frames cyclically")
+parser.add_argument("--tx-queue-size", type=int, default=256, help="Frames buffered while the socket is saturated")
+parser.add_argument("--update-interval", type=float, default=1.0, help="Payload refresh period in --bcm mode (s)")
+parser.add_argument("--simulate", action="store_true", help="Simulated clock and bus instead of --channel")
+args = parser.parse_args()
+
+scenario = scenario_compiler.load_scenario(args.scenario)
+frames = scenario_compiler.load_frames(scenario, args.dtc)
+total_cycles, pid_count, _ = frames.shape
+cycle_duration_sec = scenario["cycle_duration_sec"]
+# spread the frames evenly over the cycle instead of a fixed 15 ms gap after each one
+frame_spacing_sec = cycle_duration_sec / pid_count
+
+messages = [can.Message(arbitration_id=RESPONSE_ID, data=bytearray(frames[0, j]), is_extended_id=False)
+            for j in range(pid_count)]
+
+
+def load_cycle(cycle):
+    row = frames[cycle]
+    for j in range(pid_count):
+        messages[j].data[:] = row[j].tobytes()
+
+def run_scheduled(scheduler):
+    while True:
+        cycle = scheduler.wait()
+        if cycle >= total_cycles:
+            break
+        row = frames[cycle]
+        for j in range(pid_count):
+            if j:
+                scheduler.sleep_until_offset(j * frame_spacing_sec)
+            msg = messages[j]
+            msg.data[:] = row[j].tobytes()
+            send(msg)
+
+def run_bcm(scheduler):
+    # One kernel cyclic task per PID, started frame_spacing apart so they keep their phase.
+    # Python only wakes up every --update-interval to patch the payloads.
+    load_cycle(0)
+    tasks = []
+    for j in range(pid_count):
+        if j:
+            time.sleep(frame_spacing_sec)
+        tasks.append(bus.send_periodic(messages[j], cycle_duration_sec, store_task=False))
+    start = clock.time()
+    try:
+        while True:
+            scheduler.wait()
+            cycle = int((clock.time() - start) / cycle_duration_sec)
+            if cycle >= total_cycles:
+                break
+            load_cycle(cycle)
+            for task, msg in zip(tasks, messages):
+                task.modify_data(msg)
+    finally:
+        for task in tasks:
+            task.stop()
+
+
+def write_timeline(network, prefix):
+    # every frame in simulated seconds, then per PID counts and decoded value ranges
+    decode = scenario_compiler.decoders(scenario)
+    stats = {}
+    timeline_filename = f"{prefix}_timeline.csv"
+    with open(timeline_filename, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["TimeSec", "CanId", "Data", "PID", "Name", "Value"])
+        for t, can_id, data in network.timeline:
+            pid = data[2] if len(data) > 2 else None
+            if pid not in decode:
+                writer.writerow([f"{t:.6f}", f"{can_id:03X}", data.hex(" ").upper(), "", "", ""])
+                continue
+            pid_name, fn = decode[pid]
+            value = fn(data)
+            writer.writerow([f"{t:.6f}", f"{can_id:03X}", data.hex(" ").upper(), f"{pid:02X}", pid_name, f"{value:g}"])
+            s = stats.get(pid)
+            if s is None:
+                stats[pid] = [1, t, t, value, value]
+            else:
+                s[0] += 1
+                s[2] = t
+                s[3] = min(s[3], value)
+                s[4] = max(s[4], value)
+    summary_filename = f"{prefix}_summary.csv"
+    with open(summary_filename, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["PID", "Name", "Count", "FirstSec", "LastSec", "MinValue", "MaxValue"])
+        for pid, (count, first, last, low, high) in sorted(stats.items()):
+            writer.writerow([f"{pid:02X}", decode[pid][0], count, f"{first:.3f}", f"{last:.3f}", f"{low:g}", f"{high:g}"])
+    print(f"Simulated timeline written to {timeline_filename}, summary to {summary_filename}")
+
+
+if args.simulate:
+    if args.bcm:
+        parser.error("--simulate drives the scheduled loop, not CAN_BCM")
+    clock = SimClock()
+    network = SimNetwork(clock)
+    bus = network.bus()
+    tx = None
+    send = bus.send
+else:
+    clock = RealClock()
+    bus = can.Bus(channel=args.channel, interface=args.interface)
+    tx = None if args.bcm else TxQueue(bus, args.tx_queue_size)
+    send = tx.send_broadcast if tx else bus.send
+name = scenario["name"]
+if args.bcm:
+    scheduler = DeadlineScheduler(args.update_interval, args.policy, clock.time, clock.sleep)
+else:
+    scheduler = DeadlineScheduler(cycle_duration_sec, args.policy, clock.time, clock.sleep)
+
+cpu_start = time.process_time()
+wall_start = time.monotonic()
+try:
+    start_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"{name}: starting at {start_str}. Duration: {total_cycles * cycle_duration_sec / 60:.1f} minutes, "
+          f"{pid_count} PIDs every {cycle_duration_sec * 1000:.0f} ms{' (CAN_BCM)' if args.bcm else ''}.")
+    if args.bcm:
+        run_bcm(scheduler)
+    else:
+        run_scheduled(scheduler)
+    print(f"{name} completed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
+
+except KeyboardInterrupt:
+    print(f"{name} Emulator stopped manually.")
+finally:
+    if tx:
+        tx.stop()
+    bus.shutdown()
+    cpu = time.process_time() - cpu_start
+    wall = time.monotonic() - wall_start
+    print(f"User-space CPU: {cpu:.2f} s over {wall:.0f} s ({cpu / max(wall, 1e-9) * 100:.2f}%)")
+    if args.simulate:
+        print(f"Simulated {clock.elapsed() / 60:.1f} minutes in {wall:.1f} s")
+        write_timeline(network, datetime.now().strftime(f'{name}_sim_%d_%m_%H_%M'))
+    else:
+        scheduler.print_summary()
+        if tx:
+            tx.print_counters()
+        jitter_filename = datetime.now().strftime(f'{name}_jitter_%d_%m_%H_%M.csv')
+        scheduler.write_histogram(jitter_filename)
+        print(f"Jitter histogram written to {jitter_filename}")
+
+"""
+    python3 broadcast_emulator.py --scenario test23 --dtc 2
+    python3 broadcast_emulator.py --scenario test13 --policy catch-up
+    python3 broadcast_emulator.py --scenario my_profile.json
+
+Check what a long profile produces without waiting for it (same scenario, simulated time):
+    python3 broadcast_emulator.py --scenario test18 --simulate
+    python3 broadcast_emulator.py --scenario test12 --simulate
+
+Precompile (and check) all scenarios ahead of a run:
+    python3 scenario_compiler.py
+
+Kernel-side cyclic transmission for multi-hour runs (payloads refreshed every 0.5 s):
+    python3 broadcast_emulator.py --scenario test13 --bcm --update-interval 0.5
+In --bcm mode the jitter histogram covers the payload updates; frame timing is the kernel's.
+"""
@@ -0,0 +1,47 @@
+import queue
+import threading
+import can
+
+# Bus capture from inside the emulator, replacing `candump -tz can0` in another terminal.
+# A dedicated bus on the same channel sees every frame, our own replies included; its
+# Notifier only queues the messages and a writer thread feeds python-can's BLF/ASC writer,
+# so neither the response path nor the socket reader ever waits for the disk.
+# Timestamps are the kernel's absolute receive times, the same clock as the emulator's logs.
+
+FORMATS = ("blf", "asc")
+
+
+class BusCapture:
+    def __init__(self, channel, interface, path, max_queue=100000):
+        self.path = path
+        self.writer = can.Logger(path)  # BLFWriter / ASCWriter by suffix
+        self.queue = queue.Queue(max_queue)
+        self.captured = 0
+        self.dropped = 0
+        self.bus = can.Bus(channel=channel, interface=interface, receive_own_messages=False)
+        self.thread = threading.Thread(target=self.write_loop, name="capture-writer", daemon=True)
+        self.thread.start()
+        self.notifier = can.Notifier(self.bus, [self.on_message])
+
+    def on_message(self, msg):
+        try:
+            self.queue.put_nowait(msg)
+        except queue.Full:
+            self.dropped += 1
+
+    def write_loop(self):
+        while True:
+            msg = self.queue.get()
+            if msg is None:
+                break
+            self.writer.on_message_received(msg)
+            self.captured += 1
+
+    def stop(self):
+        self.notifier.stop()
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.stop()
+        self.bus.shutdown()
+        print(f"Capture: {self.captured} frames written to {self.path}"
+              + (f", {self.dropped} dropped (writer fell behind)" if self.dropped else ""))
@@ -0,0 +1,83 @@
+import csv
+import time
+
+from timing_stats import summarize
+
+# Absolute-deadline cycle scheduler: cycle n is due at start + n * period on the
+# monotonic clock, so lateness in one cycle never shifts the following ones.
+CATCH_UP = "catch-up"  # run every missed cycle back to back
+SKIP = "skip"          # jump to the cycle that is due now
+
+JITTER_BUCKETS_MS = [0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100]
+
+
+class DeadlineScheduler:
+    def __init__(self, period_sec, policy=SKIP, clock=time.monotonic, sleep=time.sleep):
+        if policy not in (CATCH_UP, SKIP):
+            raise ValueError(f"Unknown policy {policy}")
+        self.period = period_sec
+        self.policy = policy
+        self.clock = clock
+        self.sleep = sleep
+        self.start = None
+        self.cycle = 0
+        self.cycle_deadline = None
+        self.lateness = []
+        self.skipped = 0
+        self.late_cycles = 0
+
+    def wait(self):
+        # Blocks until the next cycle is due and returns its index
+        if self.start is None:
+            self.start = self.clock()
+        deadline = self.start + self.cycle * self.period
+        now = self.clock()
+        if now < deadline:
+            self.sleep(deadline - now)
+            now = self.clock()
+        late = now - deadline
+        if late >= self.period:
+            self.late_cycles += 1
+            if self.policy == SKIP:
+                missed = int(late // self.period)
+                self.skipped += missed
+                self.cycle += missed
+                deadline = self.start + self.cycle * self.period
+                late = now - deadline
+        self.lateness.append(late)
+        self.cycle_deadline = deadline
+        cycle = self.cycle
+        self.cycle += 1
+        return cycle
+
+    def sleep_until_offset(self, offset_sec):
+        # Intra-cycle pacing relative to the current cycle's deadline, not to the last send
+        remaining = self.cycle_deadline + offset_sec - self.clock()
+        if remaining > 0:
+            self.sleep(remaining)
+
+    def histogram(self):
+        counts = [0] * (len(JITTER_BUCKETS_MS) + 1)
+        for late in self.lateness:
+            late_ms = late * 1000
+            for i, edge in enumerate(JITTER_BUCKETS_MS):
+                if late_ms <= edge:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return counts
+
+    def print_summary(self):
+        s = summarize(self.lateness)
+        print(f"\n=== Scheduler: {len(self.lateness)} cycles @ {self.period * 1000:.1f} ms, policy={self.policy} ===")
+        print(f"Jitter p50={s['p50'] * 1000:.3f} ms p99={s['p99'] * 1000:.3f} ms max={s['max'] * 1000:.3f} ms")
+        print(f"Late cycles: {self.late_cycles}, skipped: {self.skipped}")
+
+    def write_histogram(self, filename):
+        counts = self.histogram()
+        with open(filename, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["UpperBoundMs", "Cycles"])
+            for edge, count in zip(JITTER_BUCKETS_MS + ["inf"], counts):
+                writer.writerow([edge, count])
@@ -0,0 +1,203 @@
+import time
+import can
+import signal
+import sys
+from datetime import datetime
+
+from pid_table import RESPONSE_ID, request_filters
+from fmc_pids import build_table, get_phase, pid_names, VIN
+from obd_server import ObdServer
+from timers import TimerQueue
+from metrics import Metrics
+from tx_queue import TxQueue
+from capture import BusCapture
+import pid_codec
+
+# Same behaviour as dynamic_emulator_v0/dynamic_emulator.py, dispatched through a PidTable
+
+# Setup CAN bus (CHANNEL = 'vcan0' to run against a virtual CAN interface)
+CHANNEL = 'can0'
+bus = can.interface.Bus(channel=CHANNEL, bustype='socketcan', can_filters=request_filters())
+# all transmissions go through a bounded queue with ENOBUFS retry (VIN bursts, saturation);
+# the turnaround is recorded by its sender thread once a reply is actually on the bus
+tx = TxQueue(bus, on_sent=lambda frame, priority: on_sent(frame))
+
+# Emulator fingerprint
+ENABLE_EMULATOR_FLAG = False
+EMULATOR_FLAG = 0xDD
+
+# Fixed seed -> reproducible value stream per PID and phase (None: fresh every run)
+NOISE_SEED = None
+
+# Live latency/rate metrics, e.g. 9108 -> curl http://127.0.0.1:9108/metrics (None: no endpoint,
+# so several emulators can run on one host)
+METRICS_PORT = None
+METRICS_SNAPSHOT = datetime.now().strftime('metrics_%d_%m_%H_%M.json')
+
+# Slow/lossy ECU instead of hand-edited sleeps, e.g.
+# from faults import FaultInjector
+# FAULTS = FaultInjector(delay="uniform:10:50", drop="0C=0.05", stall="30:2000", log_path="faults.log")
+FAULTS = None
+
+# Record all traffic to a BLF ("blf") or ASC ("asc") file instead of running candump
+CAPTURE_FORMAT = None
+capture = None
+if CAPTURE_FORMAT:
+    capture = BusCapture(CHANNEL, 'socketcan', datetime.now().strftime(f'capture_%d_%m_%H_%M.{CAPTURE_FORMAT}'))
+
+table = build_table(RESPONSE_ID, EMULATOR_FLAG if ENABLE_EMULATOR_FLAG else None, seed=NOISE_SEED)
+unsupported_frames = {}
+
+# Track stats
+pid_value_ranges = {}
+raw_value_pids = set()  # PIDs whose range is in raw units, not J1979
+last_phase = None
+metrics = Metrics(pid_names)
+rx_time = 0.0
+
+def handle_exit(signum, frame):
+    print_summary()
+    tx.stop()
+    bus.shutdown()
+    if capture:
+        capture.stop()
+    if FAULTS:
+        FAULTS.close()
+        FAULTS.print_counters()
+    metrics.snapshot(METRICS_SNAPSHOT)
+    print(f"Metrics snapshot written to {METRICS_SNAPSHOT}")
+    sys.exit(0)
+
+signal.signal(signal.SIGINT, handle_exit)
+
+def reply_value(pid, msg):
+    # J1979 value (pid_codec) when the reply has exactly the PID's J1979 length, otherwise
+    # the raw number, recorded in raw_value_pids so the summary labels it
+    data = msg.data
+    value = pid_codec.decode(pid, data[3:data[0] + 1], exact=True)
+    if value is None:
+        raw_value_pids.add(pid)
+        return table.value_of(msg)
+    return value
+
+def update_range(pid, value):
+    if pid not in pid_value_ranges:
+        pid_value_ranges[pid] = [value, value]
+    else:
+        pid_value_ranges[pid][0] = min(pid_value_ranges[pid][0], value)
+        pid_value_ranges[pid][1] = max(pid_value_ranges[pid][1], value)
+
+def print_summary():
+    current_phase = get_phase()
+    print(f"\n=== PID REQUEST SUMMARY @ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Phase: {current_phase.upper()} ===")
+    for pid in sorted(pid_request_counts):
+        count = pid_request_counts[pid]
+        value_range = pid_value_ranges.get(pid, [float('nan'), float('nan')])
+        name = pid_names.get(pid, "Unknown")
+        units = " (raw)" if pid in raw_value_pids else ""
+        print(f"PID 0x{pid:02X} ({name}): {count} requests, value range{units} = [{value_range[0]}, {value_range[1]}]")
+    s = metrics.overall().summary()
+    print(f"Turnaround since start: n={s['count']} p50={s['p50'] * 1000:.2f} ms "
+          f"p99={s['p99'] * 1000:.2f} ms max={s['max'] * 1000:.2f} ms")
+    tx.print_counters()
+
+def on_response(pid, msg):
+    metrics.request(pid, get_phase())
+    update_range(pid, reply_value(pid, msg))
+
+def on_multi_response(pids, answered):
+    phase = get_phase()
+    for pid in pids:
+        metrics.request(pid, phase)
+    for pid, msg in answered:
+        update_range(pid, reply_value(pid, msg))
+
+def reply_pids(data):
+    # PIDs in a single-frame mode 01 reply, several for a multi-PID request
+    pids = []
+    i = 2
+    end = 1 + (data[0] & 0x0F)
+    while i < end:
+        size = table.value_size(0x01, data[i])
+        if size is None:
+            break
+        pids.append(data[i])
+        i += 1 + size
+    return pids
+
+def on_sent(frame):
+    # TX thread: single-frame mode 01 replies stamped by StampedSender, every PID in the
+    # frame gets the turnaround; the unsupported replies carry no stamp and are not timed,
+    # segmented multi-PID replies are not timed either
+    data = frame.data
+    if frame.timestamp and data[0] & 0xF0 == 0 and data[1] == 0x41:
+        turnaround = time.time() - frame.timestamp
+        phase = get_phase()
+        for pid in reply_pids(data):
+            metrics.observe(pid, turnaround, phase)
+
+def on_unsupported(pid):
+    metrics.request(pid, get_phase())
+    print(f"[!] Unsupported PID 0x{pid:02X}")
+    tx.send(unsupported(pid))
+
+def unsupported(pid):
+    msg = unsupported_frames.get(pid)
+    if msg is None:
+        msg = can.Message(arbitration_id=RESPONSE_ID, data=[3, 0x41, pid, 0x00, 0, 0, 0, 0], is_extended_id=False)
+        unsupported_frames[pid] = msg
+    return msg
+
+
+class StampedSender:
+    # bus.send() for ObdServer: stamps each reply with the receive time of the request it
+    # answers, TxQueue (and FaultyBus) carry the stamp to on_sent
+    def __init__(self, bus):
+        self.bus = bus
+
+    def send(self, msg, timeout=None):
+        msg.timestamp = rx_time
+        return self.bus.send(msg, timeout)
+
+
+# Single and multi-PID mode 01, VIN/calibration IDs/DTCs over ISO-TP with flow control
+timers = TimerQueue()
+sender = FAULTS.wrap(tx, timers.call_later) if FAULTS else tx
+server = ObdServer(StampedSender(sender), table, VIN, timers.call_later,
+                   on_response=on_response, on_unsupported=on_unsupported, on_multi_response=on_multi_response)
+pid_request_counts = server.requests
+
+if METRICS_PORT:
+    metrics.serve(METRICS_PORT)
+print("OBD-II Emulator (v4, PID table) started. Press Ctrl+C to stop.")
+last_summary_time = time.time()
+summary_interval = 120
+
+while True:
+    current_phase = get_phase()
+    if current_phase != last_phase:
+        pid_request_counts.clear()
+        pid_value_ranges.clear()
+        raw_value_pids.clear()
+        last_phase = current_phase
+    msg = bus.recv(timeout=timers.timeout(1.0))
+    if msg:
+        rx_time = msg.timestamp or time.time()
+        server.on_message(msg)
+    timers.run_due()
+
+    if time.time() - last_summary_time >= summary_interval:
+        print_summary()
+        last_summary_time = time.time()
+
+
+"""
+Run from this directory so the sibling modules resolve:
+    cd src/emulator/dynamic_emulator_v4 && python3 dynamic_emulator.py
+
+Compare dispatch cost against the v0 path:
+    python3 bench_dispatch.py --iterations 200000
+
+Set CAPTURE_FORMAT = "blf" to record the bus from inside the emulator; the v0 workflow was
+    candump -tz can0 > fmc003_startTime_freematics_.txt
+"""
@@ -0,0 +1,95 @@
+from pid_table import PidTable
+from noise_pools import NoisePools
+import fmc_pids
+from fmc_pids import get_phase
+
+# Virtual ECUs answering functional (0x7DF) requests, one per response ID 0x7E8-0x7EF.
+# Physical requests to 0x7E0 + n reach only the ECU answering on 0x7E8 + n.
+
+# Every builder gets the ECU's NoisePools, so a seeded run replays the same values. The
+# pools are per ECU with the same seed: the speed stream, keyed like fmc_pids, is the
+# same vehicle speed on every ECU; other keys carry the response ID.
+
+GEAR_RATIOS = {1: 3.538, 3: 1.310, 5: 0.838}  # actual gear -> ratio for the phase's gear
+
+def speed(noise):
+    return fmc_pids.phase_value(0x0D, noise)
+
+def control_voltage(response_id, noise):
+    return noise.uniform_int((response_id, 0x42), 13500, 14200)  # J1979 0x42: 2 bytes, mV
+
+def actual_gear():
+    # J1979 0xA4: A bit 1 = gear supported, B[7:4] = actual gear, C-D = ratio / 1000
+    gear = {'low': 1, 'medium': 3, 'high': 5}[get_phase()]
+    return (0x02 << 24) | (gear << 20) | int(GEAR_RATIOS[gear] * 1000)
+
+def engine(response_id, flag, noise):
+    # the fmc_pids table, with 0x42 in J1979 encoding like every other ECU here; fmc_pids
+    # keeps the v0 script's 1-byte value for dynamic_emulator
+    table = fmc_pids.build_table(response_id, flag, seed=noise.seed)
+    table.register(0x01, 0x42, 2, control_voltage(response_id, noise))
+    return table
+
+def transmission(response_id, flag, noise):
+    table = PidTable(response_id, flag)
+    table.register(0x01, 0x0D, 1, speed(noise))
+    table.register(0x01, 0xA4, 4, actual_gear)
+    table.register(0x01, 0x42, 2, control_voltage(response_id, noise))
+    return table
+
+def abs_module(response_id, flag, noise):
+    table = PidTable(response_id, flag)
+    table.register(0x01, 0x0D, 1, speed(noise))
+    table.register(0x01, 0x42, 2, control_voltage(response_id, noise))
+    return table
+
+def body(response_id, flag, noise):
+    table = PidTable(response_id, flag)
+    table.register(0x01, 0x46, 1, noise.uniform_int((response_id, 0x46), 50, 65))
+    table.register(0x01, 0x2F, 1, noise.uniform_int((response_id, 0x2F), 140, 150))
+    return table
+
+def hybrid_battery(response_id, flag, noise):
+    table = PidTable(response_id, flag)
+    table.register(0x01, 0x5B, 1, noise.uniform_int((response_id, 0x5B), 150, 220))
+    table.register(0x01, 0x42, 2, control_voltage(response_id, noise))
+    return table
+
+def climate(response_id, flag, noise):
+    table = PidTable(response_id, flag)
+    table.register(0x01, 0x46, 1, noise.uniform_int((response_id, 0x46), 50, 65))
+    return table
+
+def cluster(response_id, flag, noise):
+    table = PidTable(response_id, flag)
+    table.register(0x01, 0x0D, 1, speed(noise))
+    table.register(0x01, 0x21, 2, noise.uniform_int((response_id, 0x21), 0, 30))
+    table.register(0x01, 0xA6, 4, lambda: 1234567)  # odometer, 0.1 km
+    return table
+
+def gateway(response_id, flag, noise):
+    table = PidTable(response_id, flag)
+    table.register(0x01, 0x42, 2, control_voltage(response_id, noise))
+    return table
+
+ECU_DEFINITIONS = [
+    ("engine", engine),
+    ("transmission", transmission),
+    ("abs", abs_module),
+    ("body", body),
+    ("hybrid_battery", hybrid_battery),
+    ("climate", climate),
+    ("cluster", cluster),
+    ("gateway", gateway),
+]
+
+def build_ecus(count, flag=None, seed=None):
+    if not 1 <= count <= 8:
+        raise ValueError("Between 1 and 8 ECUs (0x7E8-0x7EF)")
+    ecus = []
+    for index, (name, builder) in enumerate(ECU_DEFINITIONS[:count]):
+        table = builder(0x7E8 + index, flag, NoisePools(seed))
+        if not table.supports(0x01, 0x00):
+            table.register_support_masks()
+        ecus.append((name, table))
+    return ecus
@@ -0,0 +1,148 @@
+import time
+import random
+
+import can
+
+# Fault injection for single-frame mode 01 replies: response delay from a distribution,
+# per-PID drop probability, duplicated frames and bursty stalls (the ECU goes quiet for a
+# while). plan() only decides *when* a reply goes out; the caller schedules it with
+# call_later, so the receive loop never sleeps. Every injected fault is written to the
+# log together with the parameters of the run.
+#
+# Delay specs (milliseconds): fixed:20, uniform:10:50, normal:30:5, exp:20, lognormal:3:0.5
+# Drop specs: "0C=0.1,0D=0.05,*=0.01" (hex PID or * for every other PID)
+# Stall specs: "30:2000" -> on average every 30 s, 2000 ms without replies
+
+
+def parse_delay(spec, rng):
+    if not spec:
+        return None
+    kind, *params = spec.split(":")
+    p = [float(x) for x in params]
+    samplers = {
+        "fixed": lambda: p[0],
+        "uniform": lambda: rng.uniform(p[0], p[1]),
+        "normal": lambda: max(0.0, rng.gauss(p[0], p[1])),
+        "exp": lambda: rng.expovariate(1 / p[0]),
+        "lognormal": lambda: rng.lognormvariate(p[0], p[1]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"unknown delay distribution {kind!r}, expected one of {', '.join(samplers)}")
+    sampler = samplers[kind]
+    return lambda: sampler() / 1000
+
+def parse_drop(spec):
+    drops = [0.0] * 256
+    if not spec:
+        return drops
+    entries = dict(item.split("=") for item in spec.split(","))
+    default = float(entries.pop("*", 0.0))
+    drops = [default] * 256
+    for pid, probability in entries.items():
+        drops[int(pid, 16)] = float(probability)
+    return drops
+
+
+class FaultInjector:
+    def __init__(self, delay=None, drop=None, duplicate=0.0, duplicate_gap_ms=1.0, stall=None,
+                 stall_mode="drop", seed=None, log_path=None, clock=time.time):
+        self.params = {"delay": delay, "drop": drop, "duplicate": duplicate, "duplicate_gap_ms": duplicate_gap_ms,
+                       "stall": stall, "stall_mode": stall_mode, "seed": seed}
+        self.rng = random.Random(seed)
+        self.delay = parse_delay(delay, self.rng)
+        self.drops = parse_drop(drop)
+        self.duplicate = duplicate
+        self.duplicate_gap = duplicate_gap_ms / 1000
+        self.clock = clock
+        self.stall_mode = stall_mode
+        if stall:
+            interval, duration = stall.split(":")
+            self.stall_interval = float(interval)
+            self.stall_duration = float(duration) / 1000
+            self.next_stall = clock() + self.rng.expovariate(1 / self.stall_interval)
+        else:
+            self.stall_interval = None
+            self.next_stall = float("inf")
+        self.stall_until = 0.0
+        self.counts = {"passed": 0, "delayed": 0, "dropped": 0, "duplicated": 0, "stalled": 0, "stalls": 0}
+        self.log = None
+        if log_path:
+            self.log = open(log_path, 'w')
+            self.log.write("# fault injection " + " ".join(f"{k}={v}" for k, v in self.params.items()) + "\n")
+            self.log.write("time,pid,action,delay_ms\n")
+
+    def record(self, now, pid, action, delay=0.0):
+        self.counts[action] += 1
+        if self.log:
+            self.log.write(f"{now:.6f},{pid:02X},{action},{delay * 1000:.3f}\n")
+
+    def plan(self, pid, now=None):
+        # seconds from now at which the reply goes out; [] means it is never sent
+        now = self.clock() if now is None else now
+        if now >= self.next_stall:
+            self.stall_until = self.next_stall + self.stall_duration
+            self.next_stall = self.stall_until + self.rng.expovariate(1 / self.stall_interval)
+            self.counts["stalls"] += 1
+        hold = 0.0
+        if now < self.stall_until:
+            if self.stall_mode == "drop":
+                self.record(now, pid, "stalled")
+                return []
+            hold = self.stall_until - now
+            self.record(now, pid, "stalled", hold)
+        if self.drops[pid] and self.rng.random() < self.drops[pid]:
+            self.record(now, pid, "dropped")
+            return []
+        delay = hold
+        if self.delay:
+            delay += self.delay()
+            self.record(now, pid, "delayed", delay)
+        elif not hold:
+            self.counts["passed"] += 1
+        if self.duplicate and self.rng.random() < self.duplicate:
+            self.record(now, pid, "duplicated", delay + self.duplicate_gap)
+            return [delay, delay + self.duplicate_gap]
+        return [delay]
+
+    def wrap(self, bus, call_later):
+        return FaultyBus(bus, self, call_later)
+
+    def print_counters(self):
+        c = self.counts
+        print(f"Faults injected: {c['delayed']} delayed, {c['dropped']} dropped, {c['duplicated']} duplicated, "
+              f"{c['stalled']} replies hit {c['stalls']} stalls, {c['passed']} passed untouched")
+
+    def close(self):
+        if self.log:
+            self.log.close()
+            self.log = None
+
+
+class FaultyBus:
+    # Drop-in for bus.send() in front of ObdServer: single-frame 0x41 replies go through the
+    # injector, everything else (ISO-TP segments, flow control) passes straight through.
+    def __init__(self, bus, injector, call_later):
+        self.bus = bus
+        self.injector = injector
+        self.call_later = call_later
+
+    def send(self, msg, timeout=None):
+        data = msg.data
+        # single frame (PCI 0x0n) carrying 0x41; a consecutive frame can have 0x41 in byte 1 too
+        if len(data) < 3 or data[0] & 0xF0 != 0 or data[1] != 0x41:
+            self.bus.send(msg)
+            return
+        delays = self.injector.plan(data[2])
+        if not delays:
+            return
+        if delays == [0.0]:
+            self.bus.send(msg)
+            return
+        # PidTable reuses its messages, keep the payload as it is now
+        frame = can.Message(timestamp=msg.timestamp, arbitration_id=msg.arbitration_id, data=bytes(data),
+                            is_extended_id=msg.is_extended_id)
+        for delay in delays:
+            if delay <= 0:
+                self.bus.send(frame)
+            else:
+                self.call_later(delay, self.bus.send, frame)
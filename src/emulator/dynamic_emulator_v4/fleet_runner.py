@@ -0,0 +1,123 @@
+import os
+import time
+import asyncio
+import argparse
+import subprocess
+import can
+from multiprocessing import Pool
+from datetime import datetime
+
+from pid_table import RESPONSE_ID, request_filters
+from fmc_pids import build_table, make_phase, VIN
+from obd_server import ObdServer
+
+# Many emulated vehicles from one box: one vcan interface per vehicle, vehicles spread
+# over a process pool with one asyncio loop per process.
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--vehicles", type=int, default=4, help="Create/use vcan0..vcanN-1")
+parser.add_argument("--channels", nargs="*", help="Explicit interface list instead of --vehicles")
+parser.add_argument("--interface", default="socketcan")
+parser.add_argument("--processes", type=int, default=os.cpu_count())
+parser.add_argument("--minutes", type=float, default=5)
+parser.add_argument("--phase-step-sec", type=float, default=7, help="Scenario phase offset between vehicles")
+parser.add_argument("--seed", type=int, help="Reproducible PID values; vehicle n uses seed + n")
+parser.add_argument("--no-create", action="store_true", help="Do not try to create missing vcan interfaces")
+
+
+def fleet_vin(index):
+    # keep the WMI/VDS of the base VIN, serial number = vehicle index
+    return VIN[:11] + f"{index:06d}"
+
+def ensure_vcan(channel):
+    if os.path.exists(f"/sys/class/net/{channel}"):
+        return
+    subprocess.run(["ip", "link", "add", "dev", channel, "type", "vcan"], check=True)
+    subprocess.run(["ip", "link", "set", "up", channel], check=True)
+
+
+class Vehicle:
+    def __init__(self, index, channel, interface, phase_offset_sec, seed=None):
+        self.index = index
+        self.channel = channel
+        self.vin = fleet_vin(index)
+        self.bus = can.Bus(channel=channel, interface=interface, can_filters=request_filters())
+        # shifting the phase start makes each vehicle sit in a different low/medium/high phase
+        self.table = build_table(RESPONSE_ID, phase=make_phase(time.time() - phase_offset_sec),
+                                 seed=None if seed is None else seed + index)
+        self.server = None
+
+    def attach(self, loop):
+        self.server = ObdServer(self.bus, self.table, self.vin, loop.call_later)
+
+    def result(self, elapsed):
+        return {
+            "index": self.index,
+            "channel": self.channel,
+            "vin": self.vin,
+            "requests": sum(self.server.requests.values()),
+            "responses": self.server.responses,
+            "responses_per_sec": self.server.responses / elapsed if elapsed else 0.0,
+        }
+
+
+async def run_vehicles(vehicles, runtime_sec):
+    loop = asyncio.get_running_loop()
+    notifiers = []
+    for vehicle in vehicles:
+        vehicle.attach(loop)
+        notifiers.append(can.Notifier(vehicle.bus, [vehicle.server.on_message], loop=loop))
+    try:
+        await asyncio.sleep(runtime_sec)
+    finally:
+        for notifier in notifiers:
+            notifier.stop()
+
+def worker(job):
+    assignments, interface, runtime_sec, seed = job
+    vehicles = [Vehicle(index, channel, interface, offset, seed) for index, channel, offset in assignments]
+    start = time.monotonic()
+    try:
+        asyncio.run(run_vehicles(vehicles, runtime_sec))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.monotonic() - start
+        for vehicle in vehicles:
+            vehicle.bus.shutdown()
+    return [vehicle.result(elapsed) for vehicle in vehicles]
+
+def print_report(results, elapsed):
+    print(f"\n=== Fleet summary @ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ({elapsed:.0f} s) ===")
+    for r in sorted(results, key=lambda r: r["index"]):
+        print(f"{r['channel']:>8} {r['vin']}: {r['requests']} requests, {r['responses']} responses, "
+              f"{r['responses_per_sec']:.1f} resp/s")
+    total = sum(r["responses"] for r in results)
+    print(f"Aggregate: {len(results)} vehicles, {total} responses, {total / elapsed if elapsed else 0:.1f} resp/s")
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    channels = args.channels or [f"vcan{i}" for i in range(args.vehicles)]
+    if args.interface == "socketcan" and not args.no_create:
+        for channel in channels:
+            ensure_vcan(channel)
+
+    processes = max(1, min(args.processes, len(channels)))
+    jobs = [([], args.interface, args.minutes * 60, args.seed) for _ in range(processes)]
+    for index, channel in enumerate(channels):
+        jobs[index % processes][0].append((index, channel, index * args.phase_step_sec))
+
+    print(f"Fleet: {len(channels)} vehicles over {processes} processes for {args.minutes:g} minutes.")
+    start = time.monotonic()
+    with Pool(processes) as pool:
+        results = [r for batch in pool.map(worker, jobs) for r in batch]
+    print_report(results, time.monotonic() - start)
+
+
+"""
+Needs root (or CAP_NET_ADMIN) to create the vcan interfaces:
+    sudo modprobe vcan
+    sudo python3 fleet_runner.py --vehicles 200 --minutes 10
+    python3 fleet_runner.py --channels vcan0 vcan1 --no-create
+"""
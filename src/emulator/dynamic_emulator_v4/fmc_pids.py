@@ -0,0 +1,119 @@
+import time
+
+from pid_table import PidTable, RESPONSE_ID
+from noise_pools import NoisePools, PhaseClock
+from vehicle_info import STORED_DTCS
+
+# Same PID set and phase-aware stress values as dynamic_emulator_v0/dynamic_emulator.py
+pid_names = {
+    0x01: "Monitor Status",
+    0x0C: "Engine RPM",
+    0x0D: "Speed",
+    0x1F: "Runtime",
+    0x21: "Distance Traveled",
+    0x31: "DTC Distance",
+    0x42: "Control Voltage",
+    0x46: "Air Temp",
+    0x4E: "Fuel Rate"
+}
+
+# PID order polled by the FMC003 (see dynamic_emulator_v2/test_23_*/canlog.txt)
+FMC003_POLL_SEQUENCE = [
+    0x05, 0x06, 0x0A, 0x0B, 0x0C, 0x0D, 0x0E, 0x0F, 0x10, 0x11, 0x1F, 0x21,
+    0x22, 0x23, 0x2C, 0x2D, 0x2F, 0x31, 0x33, 0x42, 0x43, 0x44, 0x46, 0x47,
+    0x4D, 0x4E, 0x51, 0x52, 0x59, 0x5B, 0x5C, 0x5D, 0x5E,
+]
+
+VIN = "WVWZZZE1ZMP018990"
+
+START_TIME = time.time()
+
+PHASES = ('low', 'medium', 'high')
+
+def make_phase(start_time, clock=time.time):
+    # 90-second cycle: 30s per phase
+    return PhaseClock(start_time, 30, PHASES, clock)
+
+get_phase = make_phase(START_TIME)
+
+PHASE_RANGES = {
+    0x0C: {'low': (4000, 6000), 'medium': (6000, 12000), 'high': (12000, 20000)},
+    0x0D: {'low': (0, 20), 'medium': (20, 60), 'high': (60, 100)},
+    0x1F: {'low': (16, 200), 'medium': (200, 600), 'high': (600, 1000)},
+    0x21: {'low': (0, 3), 'medium': (3, 10), 'high': (10, 30)},
+    0x46: {'low': (90, 100), 'medium': (60, 90), 'high': (40, 60)},
+}
+
+# Less frequent PIDs with constant payloads
+STATIC_PIDS = {
+    0x00: [0b10111110, 0b11100000, 0x00, 0x18],
+    0x20: [0b11000000, 0x00, 0x00, 0x00],
+    0x40: [0b00110000, 0b00110000, 0x00, 0x00],
+    0x04: [30],
+    0x06: [0x00],
+    0x0A: [0x0C],
+    0x0B: [0x3C],
+    0x0E: [0x1E],
+    0x0F: [70],
+    0x10: [(1050 >> 8) & 0xFF, 1050 & 0xFF],
+    0x11: [90],
+    0x22: [0x01, 0x02],
+    0x23: [0x55, 0x55],
+    0x2D: [0x20],
+    0x2F: [57],
+    0x33: [0x00, 0x01],
+    0x44: [0x00, 0xC8],
+    0x47: [28],
+    0x4B: [0x00, 0x00],
+    0x4D: [0x10],
+    0x51: [0x40],
+    0x52: [0x01, 0x00],
+    0x59: [0x00, 0x01],
+    0x5B: [0x00],
+    0x5C: [0x00],
+    0x5D: [0x00],
+    0x5E: [0x00],
+    0x60: [0x00, 0x00, 0x00, 0x00],
+    0x80: [0x00, 0x00, 0x00, 0x00],
+    0xA0: [0x00, 0x00, 0x00, 0x00],
+}
+
+def phase_value(pid, noise, phase=get_phase):
+    pools = {name: noise.uniform_int((pid, i), *PHASE_RANGES[pid][name]) for i, name in enumerate(PHASES)}
+    return lambda: pools[phase()]()
+
+def make_counters():
+    # 0x2C steps on every request, 0x43 follows it; one counter per table so that
+    # seeded tables replay the same bytes
+    dynamic_counter = 0
+
+    def counter_2C():
+        nonlocal dynamic_counter
+        dynamic_counter = (dynamic_counter + 1) % 256
+        return dynamic_counter
+
+    def counter_43():
+        return dynamic_counter % 128
+    return counter_2C, counter_43
+
+def build_table(response_id=RESPONSE_ID, flag=None, phase=get_phase, seed=None):
+    # same seed -> same value sequence per PID and phase, so the same bytes on the bus
+    noise = NoisePools(seed)
+    table = PidTable(response_id, flag)
+    # monitor status byte A agrees with mode 03: MIL on (bit 7) with the stored DTC count
+    status_a = (0x80 if STORED_DTCS else 0) | len(STORED_DTCS)
+    table.register(0x01, 0x01, 4, lambda: (status_a << 24) | 0x00070F)
+    for pid, size in [(0x0C, 2), (0x0D, 1), (0x1F, 2), (0x21, 2), (0x46, 1)]:
+        table.register(0x01, pid, size, phase_value(pid, noise, phase))
+    table.register(0x01, 0x31, 1, noise.uniform_int((0x31,), 1, 20))
+    table.register(0x01, 0x42, 1, noise.uniform_int((0x42,), 110, 140))
+    table.register(0x01, 0x4E, 2, noise.uniform_int((0x4E,), 0, 400))
+    coolant = noise.uniform_int((0x05,), 50, 90)
+    table.register(0x01, 0x05, 1, lambda: (coolant() + 1) % 100)
+    counter_2C, counter_43 = make_counters()
+    table.register(0x01, 0x2C, 1, counter_2C)
+    table.register(0x01, 0x43, 1, counter_43)
+    table.register_frame(0x01, 0x03, [0x02, 0x43, 0x00, 0x00, 0, 0, 0, 0])
+    for pid, payload in STATIC_PIDS.items():
+        table.register_static(0x01, pid, payload)
+    return table
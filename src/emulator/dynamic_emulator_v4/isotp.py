@@ -0,0 +1,203 @@
+import can
+
+# ISO 15765-2 transport for the emulator side: single frames, first/consecutive frames
+# paced by the tester's flow control (block size, STmin), and reassembly of segmented
+# requests. Timers come from call_later (asyncio loop or timers.TimerQueue).
+
+SINGLE_FRAME = 0x00
+FIRST_FRAME = 0x10
+CONSECUTIVE_FRAME = 0x20
+FLOW_CONTROL = 0x30
+
+FLOW_CONTINUE = 0
+FLOW_WAIT = 1
+FLOW_OVERFLOW = 2
+
+N_BS_TIMEOUT_SEC = 1.0  # wait for flow control
+N_CR_TIMEOUT_SEC = 1.0  # wait for the next consecutive frame
+MAX_WAIT_FRAMES = 10
+
+
+def stmin_to_sec(value):
+    if value <= 0x7F:
+        return value / 1000
+    if 0xF1 <= value <= 0xF9:
+        return (value - 0xF0) / 10000
+    return 0x7F / 1000  # reserved values are treated as the maximum
+
+def segment(payload, padding=0x00):
+    n = len(payload)
+    if n <= 7:
+        frame = [SINGLE_FRAME | n] + list(payload)
+        return [frame + [padding] * (8 - len(frame))]
+    frames = [[FIRST_FRAME | (n >> 8), n & 0xFF] + list(payload[:6])]
+    seq = 1
+    for i in range(6, n, 7):
+        frame = [CONSECUTIVE_FRAME | (seq & 0x0F)] + list(payload[i:i + 7])
+        frames.append(frame + [padding] * (8 - len(frame)))
+        seq += 1
+    return frames
+
+
+class IsoTpSender:
+    def __init__(self, bus, tx_id, fc_ids, call_later, padding=0x00):
+        self.bus = bus
+        self.tx_id = tx_id
+        self.fc_ids = set(fc_ids)
+        self.call_later = call_later
+        self.padding = padding
+        self.pending = None
+        self.index = 0
+        self.block_left = 0
+        self.stmin = 0.0
+        self.wait_frames = 0
+        self.timer = None
+        self.stats = {"single": 0, "multi": 0, "aborted": 0, "fc_wait": 0}
+
+    def busy(self):
+        return self.pending is not None
+
+    def send(self, payload):
+        frames = [can.Message(arbitration_id=self.tx_id, data=frame, is_extended_id=False)
+                  for frame in segment(payload, self.padding)]
+        if len(frames) == 1:
+            self.bus.send(frames[0])
+            self.stats["single"] += 1
+            return
+        if self.pending is not None:
+            self._abort()
+        self.pending = frames
+        self.index = 1
+        self.wait_frames = 0
+        self.bus.send(frames[0])
+        self._arm(N_BS_TIMEOUT_SEC)
+
+    def on_message(self, msg):
+        # Returns True when msg was a flow control frame for the transfer in progress
+        if self.pending is None or msg.arbitration_id not in self.fc_ids:
+            return False
+        if len(msg.data) < 3 or msg.data[0] & 0xF0 != FLOW_CONTROL:
+            return False
+        self._disarm()
+        flag = msg.data[0] & 0x0F
+        if flag == FLOW_CONTINUE:
+            self.block_left = msg.data[1]
+            self.stmin = stmin_to_sec(msg.data[2])
+            self._send_next()
+        elif flag == FLOW_WAIT:
+            self.stats["fc_wait"] += 1
+            self.wait_frames += 1
+            if self.wait_frames > MAX_WAIT_FRAMES:
+                self._abort()
+            else:
+                self._arm(N_BS_TIMEOUT_SEC)
+        else:
+            self._abort()
+        return True
+
+    def _send_next(self):
+        self.timer = None
+        while self.index < len(self.pending):
+            self.bus.send(self.pending[self.index])
+            self.index += 1
+            if self.index == len(self.pending):
+                break
+            if self.block_left:
+                self.block_left -= 1
+                if self.block_left == 0:
+                    self._arm(N_BS_TIMEOUT_SEC)  # block done, next flow control expected
+                    return
+            if self.stmin > 0:
+                self.timer = self.call_later(self.stmin, self._send_next)
+                return
+        self.pending = None
+        self.stats["multi"] += 1
+
+    def _arm(self, timeout):
+        self.timer = self.call_later(timeout, self._abort)
+
+    def _disarm(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def _abort(self):
+        self._disarm()
+        self.pending = None
+        self.stats["aborted"] += 1
+
+
+class IsoTpReceiver:
+    # Reassembles requests; on_payload(payload, arbitration_id) gets every complete one
+    def __init__(self, bus, rx_ids, fc_id, on_payload, call_later, block_size=0, stmin=0):
+        self.bus = bus
+        self.rx_ids = set(rx_ids)
+        self.on_payload = on_payload
+        self.call_later = call_later
+        self.flow_control = can.Message(arbitration_id=fc_id, is_extended_id=False,
+                                        data=[FLOW_CONTROL | FLOW_CONTINUE, block_size, stmin, 0, 0, 0, 0, 0])
+        self.block_size = block_size
+        self.buffer = None
+        self.expected = 0
+        self.seq = 0
+        self.block_count = 0
+        self.source = None
+        self.timer = None
+        self.stats = {"single": 0, "multi": 0, "dropped": 0}
+
+    def on_message(self, msg):
+        if msg.arbitration_id not in self.rx_ids or not msg.data:
+            return False
+        data = msg.data
+        kind = data[0] & 0xF0
+        if kind == SINGLE_FRAME:
+            length = data[0] & 0x0F
+            if 0 < length <= len(data) - 1:
+                self.stats["single"] += 1
+                self.on_payload(data[1:1 + length], msg.arbitration_id)
+            return True
+        if kind == FIRST_FRAME and len(data) == 8:
+            if self.buffer is not None:
+                self.stats["dropped"] += 1
+            self.expected = ((data[0] & 0x0F) << 8) | data[1]
+            self.buffer = bytearray(data[2:8])
+            self.seq = 1
+            self.block_count = 0
+            self.source = msg.arbitration_id
+            self.bus.send(self.flow_control)
+            self._arm()
+            return True
+        if kind == CONSECUTIVE_FRAME and self.buffer is not None and msg.arbitration_id == self.source:
+            if data[0] & 0x0F != self.seq & 0x0F:
+                self._drop()
+                return True
+            self.buffer += data[1:8]
+            self.seq += 1
+            if len(self.buffer) >= self.expected:
+                self._disarm()
+                payload = bytes(self.buffer[:self.expected])
+                self.buffer = None
+                self.stats["multi"] += 1
+                self.on_payload(payload, self.source)
+                return True
+            self.block_count += 1
+            if self.block_size and self.block_count == self.block_size:
+                self.block_count = 0
+                self.bus.send(self.flow_control)
+            self._arm()
+            return True
+        return False
+
+    def _arm(self):
+        self._disarm()
+        self.timer = self.call_later(N_CR_TIMEOUT_SEC, self._drop)
+
+    def _disarm(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def _drop(self):
+        self._disarm()
+        self.buffer = None
+        self.stats["dropped"] += 1
@@ -0,0 +1,219 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Live response metrics for long soak runs: an HDR-style latency histogram and a request
+# rate counter per (PID, phase), served as Prometheus text on http://127.0.0.1:<port>/metrics
+# and written to a JSON snapshot on exit.
+
+SUB_BUCKETS = 16      # per power of two -> values are kept to ~6 % precision
+MAX_EXPONENT = 27     # 2^27 us ~ 134 s, anything slower lands in the last bucket
+# coarse cumulative buckets exported to Prometheus, seconds
+EXPORT_BOUNDS = [0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0]
+RATE_WINDOW_SEC = 10
+
+
+class LatencyHistogram:
+    # log-linear buckets over microseconds: exact below SUB_BUCKETS us, then
+    # SUB_BUCKETS linear steps per power of two (the HdrHistogram layout)
+
+    def __init__(self):
+        self.counts = [0] * (SUB_BUCKETS * (MAX_EXPONENT + 1))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def index(us):
+        if us < SUB_BUCKETS:
+            return us
+        shift = us.bit_length() - SUB_BUCKETS.bit_length()
+        if shift >= MAX_EXPONENT:
+            return SUB_BUCKETS * (MAX_EXPONENT + 1) - 1
+        return (shift + 1) * SUB_BUCKETS + (us >> shift) - SUB_BUCKETS
+
+    @staticmethod
+    def upper_bound(index):
+        # largest microsecond value that falls into bucket `index`
+        exponent, sub = divmod(index, SUB_BUCKETS)
+        if exponent == 0:
+            return sub
+        shift = exponent - 1
+        return ((SUB_BUCKETS + sub + 1) << shift) - 1
+
+    def record(self, seconds):
+        us = max(0, int(seconds * 1e6))
+        self.counts[self.index(us)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        if not self.count:
+            return float('nan')
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(self.upper_bound(i) / 1e6, self.max)
+        return self.max
+
+    def cumulative(self, bounds):
+        # counts at or below every bound (seconds), bucket upper edges compared in us
+        result = []
+        seen = 0
+        i = 0
+        for bound in bounds:
+            limit = int(bound * 1e6)
+            while i < len(self.counts) and self.upper_bound(i) <= limit:
+                seen += self.counts[i]
+                i += 1
+            result.append(seen)
+        return result
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max,
+        }
+
+
+class RateCounter:
+    # total plus a per-second ring over the last RATE_WINDOW_SEC seconds
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.total = 0
+        self.seconds = [0] * RATE_WINDOW_SEC
+        self.stamps = [-1] * RATE_WINDOW_SEC
+
+    def add(self, n=1):
+        second = int(self.clock())
+        slot = second % RATE_WINDOW_SEC
+        if self.stamps[slot] != second:
+            self.stamps[slot] = second
+            self.seconds[slot] = 0
+        self.seconds[slot] += n
+        self.total += n
+
+    def rate(self):
+        # completed seconds only, the current one is still filling
+        now = int(self.clock())
+        full = [n for n, s in zip(self.seconds, self.stamps) if now - RATE_WINDOW_SEC < s < now]
+        return sum(full) / (RATE_WINDOW_SEC - 1)
+
+
+class Metrics:
+    def __init__(self, names=None, clock=time.monotonic):
+        self.names = names or {}
+        self.clock = clock
+        self.started = time.time()
+        self.latency = {}    # (pid, phase) -> LatencyHistogram
+        self.requests = {}   # (pid, phase) -> RateCounter
+        self.lock = threading.Lock()  # guards key creation against a concurrent scrape
+
+    def request(self, pid, phase=""):
+        counter = self.requests.get((pid, phase))
+        if counter is None:
+            with self.lock:
+                counter = self.requests.setdefault((pid, phase), RateCounter(self.clock))
+        counter.add()
+
+    def observe(self, pid, seconds, phase=""):
+        histogram = self.latency.get((pid, phase))
+        if histogram is None:
+            with self.lock:
+                histogram = self.latency.setdefault((pid, phase), LatencyHistogram())
+        histogram.record(seconds)
+
+    def overall(self):
+        merged = LatencyHistogram()
+        for histogram in list(self.latency.values()):
+            merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+            merged.count += histogram.count
+            merged.total += histogram.total
+            merged.max = max(merged.max, histogram.max)
+        return merged
+
+    def labels(self, pid, phase):
+        return f'pid="{pid:02X}",name="{self.names.get(pid, "Unknown")}",phase="{phase}"'
+
+    def prometheus(self):
+        with self.lock:
+            latency = sorted(self.latency.items())
+            requests = sorted(self.requests.items())
+        lines = [
+            "# HELP obd_requests_total Mode 01 requests received.",
+            "# TYPE obd_requests_total counter",
+        ]
+        lines += [f"obd_requests_total{{{self.labels(pid, phase)}}} {c.total}" for (pid, phase), c in requests]
+        lines += [
+            f"# HELP obd_request_rate Requests per second over the last {RATE_WINDOW_SEC} s.",
+            "# TYPE obd_request_rate gauge",
+        ]
+        lines += [f"obd_request_rate{{{self.labels(pid, phase)}}} {c.rate():.3f}" for (pid, phase), c in requests]
+        lines += [
+            "# HELP obd_response_latency_seconds Request to response turnaround.",
+            "# TYPE obd_response_latency_seconds histogram",
+        ]
+        for (pid, phase), h in latency:
+            labels = self.labels(pid, phase)
+            for bound, n in zip(EXPORT_BOUNDS, h.cumulative(EXPORT_BOUNDS)):
+                lines.append(f'obd_response_latency_seconds_bucket{{{labels},le="{bound}"}} {n}')
+            lines.append(f'obd_response_latency_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"obd_response_latency_seconds_sum{{{labels}}} {h.total:.6f}")
+            lines.append(f"obd_response_latency_seconds_count{{{labels}}} {h.count}")
+        lines += [
+            "# HELP obd_response_latency_quantile_seconds Turnaround percentiles since start.",
+            "# TYPE obd_response_latency_quantile_seconds gauge",
+        ]
+        for (pid, phase), h in latency:
+            labels = self.labels(pid, phase)
+            for q in (50, 90, 99):
+                lines.append(f'obd_response_latency_quantile_seconds{{{labels},quantile="0.{q}"}} '
+                             f'{h.percentile(q):.6f}')
+        lines.append(f"obd_uptime_seconds {time.time() - self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self, path):
+        with self.lock:
+            latency = sorted(self.latency.items())
+            requests = sorted(self.requests.items())
+        data = {
+            "started": self.started,
+            "written": time.time(),
+            "overall": self.overall().summary(),
+            "requests": [{"pid": f"{pid:02X}", "phase": phase, "total": c.total} for (pid, phase), c in requests],
+            "latency": [dict(pid=f"{pid:02X}", phase=phase, **h.summary()) for (pid, phase), h in latency],
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    def serve(self, port, host="127.0.0.1"):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # keep the emulator console readable
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
@@ -0,0 +1,127 @@
+import time
+import random
+import asyncio
+import argparse
+import can
+from collections import defaultdict
+from datetime import datetime
+
+from pid_table import REQUEST_ID, request_filters
+from ecus import build_ecus
+
+# Up to eight virtual ECUs (0x7E8-0x7EF) in one process. A functional 0x7DF request fans out
+# to every ECU that supports the PID, each answering at its own offset inside --window-ms.
+
+PHYSICAL_BASE_ID = 0x7E0
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--channel", default="can0")
+parser.add_argument("--interface", default="socketcan")
+parser.add_argument("--ecus", type=int, default=4, help="Number of virtual ECUs (1-8)")
+parser.add_argument("--window-ms", type=float, default=10, help="Responses are staggered inside this window")
+parser.add_argument("--random-stagger", action="store_true", help="Random offset inside each ECU's slot")
+parser.add_argument("--seed", type=int, default=None, help="Reproducible PID values and stagger")
+parser.add_argument("--minutes", type=float, default=0, help="Stop after this long (0 = run until Ctrl+C)")
+args = parser.parse_args()
+
+ecus = build_ecus(args.ecus, seed=args.seed)
+stagger = random.Random(args.seed)
+slot_sec = args.window_ms / 1000 / len(ecus)
+
+# fanout[mode][pid] -> [(index, table), ...] for the ECUs that answer it, in 0x7E8.. order
+fanout = {}
+for mode in (0x01,):
+    fanout[mode] = [[] for _ in range(256)]
+    for index, (name, table) in enumerate(ecus):
+        for pid in table.pids(mode):
+            fanout[mode][pid].append((index, table))
+
+responses_per_ecu = defaultdict(int)
+burst_sizes = defaultdict(int)
+unanswered = defaultdict(int)
+
+
+class MultiEcuResponder:
+    def __init__(self, bus, loop):
+        self.bus = bus
+        self.loop = loop
+
+    def send(self, table, mode, pid):
+        msg = table.respond(mode, pid)
+        self.bus.send(msg)
+        responses_per_ecu[table.response_id] += 1
+
+    def on_request(self, msg):
+        if len(msg.data) < 3:
+            return
+        mode = msg.data[1]
+        pid = msg.data[2]
+        targets = fanout.get(mode)
+        if targets is None:
+            return
+        if msg.arbitration_id == REQUEST_ID:
+            ecus_for_pid = targets[pid]
+        else:
+            index = msg.arbitration_id - PHYSICAL_BASE_ID
+            ecus_for_pid = [(i, t) for i, t in targets[pid] if i == index]
+        if not ecus_for_pid:
+            unanswered[pid] += 1
+            return
+        burst_sizes[len(ecus_for_pid)] += 1
+        now = self.loop.time()
+        for index, table in ecus_for_pid:
+            offset = index * slot_sec
+            if args.random_stagger:
+                offset += stagger.uniform(0, slot_sec)
+            if offset <= 0:
+                self.send(table, mode, pid)
+            else:
+                self.loop.call_at(now + offset, self.send, table, mode, pid)
+
+
+async def run(bus):
+    loop = asyncio.get_running_loop()
+    responder = MultiEcuResponder(bus, loop)
+    reader = can.AsyncBufferedReader()
+    notifier = can.Notifier(bus, [reader], loop=loop)
+    deadline = time.monotonic() + args.minutes * 60 if args.minutes else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            try:
+                msg = await asyncio.wait_for(reader.get_message(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            responder.on_request(msg)
+        await asyncio.sleep(args.window_ms / 1000)
+    finally:
+        notifier.stop()
+
+def print_summary():
+    print(f"\n=== Multi-ECU summary @ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
+    for name, table in ecus:
+        print(f"0x{table.response_id:03X} ({name}): {responses_per_ecu[table.response_id]} responses, "
+              f"{len(table.pids(0x01))} PIDs")
+    for size in sorted(burst_sizes):
+        print(f"Requests answered by {size} ECU(s): {burst_sizes[size]}")
+    for pid in sorted(unanswered):
+        print(f"[!] PID 0x{pid:02X} unsupported by all ECUs: {unanswered[pid]} requests")
+
+
+if __name__ == "__main__":
+    bus = can.Bus(channel=args.channel, interface=args.interface,
+                  can_filters=request_filters(PHYSICAL_BASE_ID, 0x7F8))
+    print(f"Multi-ECU emulator: {len(ecus)} ECUs on {args.channel}, {args.window_ms:g} ms response window. "
+          f"Press Ctrl+C to stop.")
+    try:
+        asyncio.run(run(bus))
+    except KeyboardInterrupt:
+        print("Multi-ECU emulator stopped manually.")
+    finally:
+        bus.shutdown()
+        print_summary()
+
+
+"""
+    python3 multi_ecu_responder.py --ecus 8 --window-ms 20
+    candump -tz can0,7DF:7FF,7E8:7F8
+"""
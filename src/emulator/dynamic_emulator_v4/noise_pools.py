@@ -0,0 +1,117 @@
+import time
+import queue
+import threading
+import numpy as np
+
+# Pre-generated random values for the phase-aware PID handlers. Every pool owns its own
+# NumPy generator derived from (seed, key), so the n-th value drawn from a pool depends
+# only on the seed and the pool key, not on request timing or on when refills ran.
+# A pool is double buffered: when half of the current batch is used a background thread
+# generates the next one; if it is not ready in time the consumer generates it inline.
+
+POOL_SIZE = 4096
+
+_refills = queue.Queue()
+_refill_thread = None
+_refill_lock = threading.Lock()
+
+
+def _refill_worker():
+    while True:
+        _refills.get().fill_next()
+
+def _request_refill(pool):
+    global _refill_thread
+    if _refill_thread is None:
+        with _refill_lock:
+            if _refill_thread is None:
+                _refill_thread = threading.Thread(target=_refill_worker, name="noise-refill", daemon=True)
+                _refill_thread.start()
+    _refills.put(pool)
+
+
+class Pool:
+    def __init__(self, rng, low, high, size=POOL_SIZE, background=True):
+        self.rng = rng
+        self.low = low
+        self.high = high
+        self.size = size
+        self.background = background
+        self.lock = threading.Lock()
+        self.next_values = None
+        self.values = self.generate()
+        self.index = 0
+        self.refills = 0
+
+    def generate(self):
+        # inclusive bounds like random.randint; tolist() so handlers get plain ints
+        return self.rng.integers(self.low, self.high, size=self.size, endpoint=True).tolist()
+
+    def fill_next(self):
+        with self.lock:
+            if self.next_values is None:
+                self.next_values = self.generate()
+                self.refills += 1
+
+    def __call__(self):
+        index = self.index
+        if index == self.size:
+            self.fill_next()  # no-op when the background refill already ran
+            self.values, self.next_values = self.next_values, None
+            index = 0
+        elif index == self.size // 2:
+            if self.background:
+                _request_refill(self)
+            else:
+                self.fill_next()
+        self.index = index + 1
+        return self.values[index]
+
+
+class NoisePools:
+    def __init__(self, seed=None, size=POOL_SIZE, background=True):
+        self.seed = seed
+        self.entropy = np.random.SeedSequence(seed).entropy
+        self.size = size
+        self.background = background
+        self.pools = {}
+
+    def uniform_int(self, key, low, high):
+        # key: tuple of small ints, e.g. (pid, phase index); one stream per key
+        pool = self.pools.get(key)
+        if pool is None:
+            sequence = np.random.SeedSequence(self.entropy, spawn_key=key)
+            pool = Pool(np.random.default_rng(sequence), low, high, self.size, self.background)
+            self.pools[key] = pool
+        return pool
+
+    def refills(self):
+        return sum(pool.refills for pool in self.pools.values())
+
+
+class PhaseClock:
+    # Drop-in for fmc_pids.get_phase: the phase name is cached together with the time of
+    # the next transition, a call only compares the clock against that boundary.
+
+    def __init__(self, start_time, phase_sec=30, phases=("low", "medium", "high"), clock=time.time):
+        self.start_time = start_time
+        self.phase_sec = phase_sec
+        self.phases = phases
+        self.clock = clock
+        self.index = 0
+        self.current = phases[0]
+        self.phase_start = float("inf")
+        self.next_change = float("-inf")
+
+    def __call__(self):
+        now = self.clock()
+        if not self.phase_start <= now < self.next_change:  # also catches clock steps back
+            self.advance(now)
+        return self.current
+
+    def advance(self, now):
+        slot = int((now - self.start_time) // self.phase_sec)
+        self.index = slot % len(self.phases)
+        self.current = self.phases[self.index]
+        self.phase_start = self.start_time + slot * self.phase_sec
+        self.next_change = self.phase_start + self.phase_sec
@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+from pid_table import REQUEST_ID, RESPONSE_ID, PHYSICAL_ID
+from isotp import IsoTpSender, IsoTpReceiver
+from vehicle_info import service_payload
+
+MAX_PIDS_PER_REQUEST = 6  # SAE J1979 limit for mode 01
+
+
+class ObdServer:
+    # One emulated ECU on top of ISO-TP: mode 01 (single and multi-PID) from a PidTable,
+    # VIN/calibration/DTC services from vehicle_info. Feed every received frame to on_message().
+    def __init__(self, bus, table, vin, call_later, response_id=RESPONSE_ID, physical_id=PHYSICAL_ID,
+                 on_response=None, on_unsupported=None, on_multi_response=None):
+        self.bus = bus
+        self.table = table
+        self.vin = vin
+        self.on_response = on_response        # on_response(pid, msg) after a single-PID reply
+        self.on_unsupported = on_unsupported  # on_unsupported(pid), default is to stay silent
+        # on_multi_response(pids, answered) after a multi-PID request: every requested PID,
+        # and (pid, single-PID frame) for those in the reply; unsupported ones are left out
+        # silently, as J1979 asks, so on_unsupported is not called for them
+        self.on_multi_response = on_multi_response
+        self.sender = IsoTpSender(bus, response_id, [physical_id, REQUEST_ID], call_later)
+        self.receiver = IsoTpReceiver(bus, [REQUEST_ID, physical_id], response_id, self.on_request, call_later)
+        self.requests = defaultdict(int)
+        self.responses = 0
+        self.multi_pid_requests = 0
+
+    def on_message(self, msg):
+        if not self.sender.on_message(msg):
+            self.receiver.on_message(msg)
+
+    def on_request(self, payload, arbitration_id):
+        mode = payload[0]
+        if mode == 0x01 and len(payload) > 2:
+            pids = payload[1:1 + MAX_PIDS_PER_REQUEST]
+            for pid in pids:
+                self.requests[pid] += 1
+            self.multi_pid_requests += 1
+            answered = [] if self.on_multi_response else None
+            response = self.table.respond_many(mode, pids, answered)
+            if len(response) > 1:
+                self.sender.send(response)
+                self.responses += 1
+            if self.on_multi_response:
+                self.on_multi_response(pids, answered)
+            return
+
+        pid = payload[1] if len(payload) > 1 else 0x00
+        self.requests[pid] += 1
+        if mode == 0x01:
+            msg = self.table.respond(mode, pid)
+            if msg is not None:
+                self.bus.send(msg)
+                self.responses += 1
+                if self.on_response:
+                    self.on_response(pid, msg)
+            elif self.on_unsupported:
+                self.on_unsupported(pid)
+            return
+
+        response = service_payload(mode, pid, self.vin)
+        if response is not None:
+            self.sender.send(response)
+            self.responses += 1
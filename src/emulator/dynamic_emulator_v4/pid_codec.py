@@ -0,0 +1,231 @@
+import re
+import time
+import argparse
+import numpy as np
+
+# One place for mode 01 PID scaling (SAE J1979 / ISO 15031-5). Every PID here is linear in
+# its big-endian raw value:  value = ((raw >> shift) & mask) / scale - offset.
+# Emulators encode one value at a time (PidCodec.encode, plain int arithmetic, meant for
+# PidTable handlers); analyzers decode whole uint8 frame arrays at once (decode_frames),
+# a million captured frames in milliseconds.
+#
+# The legacy scripts disagree with J1979 and with each other, e.g. "FuelRate" on 0x4E as
+# value*100 (test19-24) or value*20 (test13), while J1979 puts fuel rate on 0x5E at /20
+# and 0x4E is time since codes cleared. Reproductions of those scripts keep their own
+# scaling through PidCodec.variant() or the scenario's scale/offset, so the bytes on the
+# bus stay what the device saw.
+
+
+class PidCodec:
+    __slots__ = ("pid", "name", "unit", "size", "scale", "offset", "mask", "shift", "max_raw")
+
+    def __init__(self, pid, name, unit, size=1, scale=1, offset=0, mask=None, shift=0):
+        self.pid = pid
+        self.name = name
+        self.unit = unit
+        self.size = size
+        self.scale = scale
+        self.offset = offset
+        self.mask = mask if mask is not None else (1 << (8 * size)) - 1
+        self.shift = shift
+        self.max_raw = (1 << (8 * size)) - 1
+
+    def encode(self, value):
+        # engineering value -> raw int for PidTable.register; truncates like the scripts did
+        raw = int((value + self.offset) * self.scale) << self.shift
+        return 0 if raw < 0 else self.max_raw if raw > self.max_raw else raw
+
+    def decode_raw(self, raw):
+        return ((raw >> self.shift) & self.mask) / self.scale - self.offset
+
+    def decode(self, data, exact=False):
+        # data: the bytes after the PID; None when the reply is too short, or with exact=True
+        # any other length (a non-J1979 encoding of the PID, not padding)
+        if len(data) < self.size or exact and len(data) != self.size:
+            return None
+        return self.decode_raw(int.from_bytes(data[:self.size], "big"))
+
+    def variant(self, **changes):
+        # same PID with legacy scaling, e.g. codec(0x4E).variant(size=2, scale=100, offset=0)
+        fields = {name: getattr(self, name) for name in ("pid", "name", "unit", "size", "scale", "offset", "shift")}
+        if "size" in changes and "mask" not in changes:
+            fields["mask"] = None
+        else:
+            fields["mask"] = self.mask
+        fields.update(changes)
+        return PidCodec(**fields)
+
+    def __repr__(self):
+        return f"PidCodec(0x{self.pid:02X} {self.name}, size={self.size}, scale={self.scale:g}, offset={self.offset:g})"
+
+
+J1979 = {c.pid: c for c in [
+    PidCodec(0x01, "DTC count", "", 4, mask=0x7F, shift=24),
+    PidCodec(0x04, "Engine load", "%", 1, 2.55),
+    PidCodec(0x05, "Coolant temp", "C", 1, 1, 40),
+    PidCodec(0x06, "Short fuel trim B1", "%", 1, 1.28, 100),
+    PidCodec(0x07, "Long fuel trim B1", "%", 1, 1.28, 100),
+    PidCodec(0x0A, "Fuel pressure", "kPa", 1, 1 / 3),
+    PidCodec(0x0B, "Intake MAP", "kPa"),
+    PidCodec(0x0C, "RPM", "rpm", 2, 4),
+    PidCodec(0x0D, "Speed", "km/h"),
+    PidCodec(0x0E, "Timing advance", "deg", 1, 2, 64),
+    PidCodec(0x0F, "Intake temp", "C", 1, 1, 40),
+    PidCodec(0x10, "MAF", "g/s", 2, 100),
+    PidCodec(0x11, "Throttle", "%", 1, 2.55),
+    PidCodec(0x1F, "Runtime", "s", 2),
+    PidCodec(0x21, "Distance with MIL", "km", 2),
+    PidCodec(0x22, "Fuel rail pressure", "kPa", 2, 1 / 0.079),
+    PidCodec(0x23, "Fuel rail gauge", "kPa", 2, 0.1),
+    PidCodec(0x2C, "Commanded EGR", "%", 1, 2.55),
+    PidCodec(0x2D, "EGR error", "%", 1, 1.28, 100),
+    PidCodec(0x2F, "Fuel level", "%", 1, 2.55),
+    PidCodec(0x31, "Distance since clear", "km", 2),
+    PidCodec(0x33, "Baro pressure", "kPa"),
+    PidCodec(0x42, "Control voltage", "V", 2, 1000),
+    PidCodec(0x43, "Absolute load", "%", 2, 2.55),
+    PidCodec(0x44, "Equivalence ratio", "", 2, 32768),
+    PidCodec(0x45, "Relative throttle", "%", 1, 2.55),
+    PidCodec(0x46, "Ambient temp", "C", 1, 1, 40),
+    PidCodec(0x47, "Throttle B", "%", 1, 2.55),
+    PidCodec(0x4D, "Time with MIL", "min", 2),
+    PidCodec(0x4E, "Time since clear", "min", 2),
+    PidCodec(0x51, "Fuel type", ""),
+    PidCodec(0x52, "Ethanol", "%", 1, 2.55),
+    PidCodec(0x59, "Fuel rail abs", "kPa", 2, 0.1),
+    PidCodec(0x5B, "Hybrid battery", "%", 1, 2.55),
+    PidCodec(0x5C, "Oil temp", "C", 1, 1, 40),
+    PidCodec(0x5D, "Injection timing", "deg", 2, 128, 210),
+    PidCodec(0x5E, "Fuel rate", "L/h", 2, 20),
+]}
+
+# obd_export column -> J1979 PID, so decoded captures line up with obd_export.csv columns
+# (export_columns). The q_agent notebooks' FIELD_TO_PID holds device IO numbers, not PIDs:
+# fuel level 28 vs 0x2F, coolant 38 vs 0x05.
+FIELD_TO_PID = {
+    "obd.rpm.value": 0x0C,
+    "obd.speed.value": 0x0D,
+    "obd.fuel_level.value": 0x2F,
+    "obd.coolant_temp.value": 0x05,
+    "obd.engine_load.value": 0x04,
+    "obd.intake_temp.value": 0x0F,
+    "obd.maf.value": 0x10,
+    "obd.throttle_pos.value": 0x11,
+    "obd.ambient_air_temp.value": 0x46,
+    "obd.distance_since_codes_clear.value": 0x31,
+    "obd.time_since_codes_cleared.value": 0x4E,
+}
+
+
+def codec(pid):
+    return J1979[pid]
+
+def encode(pid, value):
+    return J1979[pid].encode(value)
+
+def decode(pid, data, exact=False):
+    c = J1979.get(pid)
+    return c.decode(data, exact) if c is not None else None
+
+def name(pid):
+    c = J1979.get(pid)
+    return c.name if c is not None else f"PID {pid:02X}"
+
+
+def lookup_tables(codecs=J1979):
+    # per-PID columns indexed by the PID byte, for decode_frames. A frame is read as one
+    # big-endian 64-bit word; value bytes A-D sit in bits 39..8, so a PID's shift grows by
+    # the low byte and by the value bytes it does not use.
+    shift = np.zeros(256, dtype=np.uint64)
+    mask = np.zeros(256, dtype=np.uint64)
+    inverse_scale = np.ones(256)
+    offset = np.zeros(256)
+    min_length = np.full(256, 0xFF, dtype=np.uint8)  # unknown PIDs never match
+    for pid, c in codecs.items():
+        shift[pid] = 8 + 8 * (4 - c.size) + c.shift
+        mask[pid] = c.mask
+        inverse_scale[pid] = 1 / c.scale
+        offset[pid] = c.offset
+        min_length[pid] = c.size + 2
+    return shift, mask, inverse_scale, offset, min_length
+
+TABLES = lookup_tables()
+
+def decode_frames(frames, tables=TABLES):
+    # frames: uint8 array (n, 8) of single-frame mode 01 replies [len, 0x41, pid, A, B, C, D, ..].
+    # Returns (pids, values); values are NaN for other services and PIDs without a codec.
+    frames = np.ascontiguousarray(frames, dtype=np.uint8)
+    shift, mask, inverse_scale, offset, min_length = tables
+    pids = frames[:, 2]
+    index = pids.astype(np.intp)
+    words = frames.view(">u8").ravel()
+    values = ((words >> shift.take(index)) & mask.take(index)) * inverse_scale.take(index) - offset.take(index)
+    values[(frames[:, 1] != 0x41) | (frames[:, 0] < min_length.take(index))] = np.nan
+    return pids, values
+
+def export_columns(pids, values, fields=FIELD_TO_PID):
+    # decode_frames output -> {obd_export column: values}, for the PIDs that have a column
+    columns = {}
+    for field, pid in fields.items():
+        selected = pids == pid
+        if selected.any():
+            columns[field] = values[selected]
+    return columns
+
+def frames_from_payloads(payloads):
+    # list of bytes-like CAN payloads -> (n, 8) uint8, short ones zero padded
+    return np.frombuffer(b"".join(bytes(p).ljust(8, b"\0")[:8] for p in payloads), dtype=np.uint8).reshape(-1, 8)
+
+
+CANDUMP_LINE = re.compile(r"\((\d+\.\d+)\)\s+\S+\s+([0-9A-Fa-f]{3,8})\s+\[8\]\s+((?:[0-9A-Fa-f]{2} ){7}[0-9A-Fa-f]{2})")
+
+def read_candump(path):
+    # `candump -tz` text -> (timestamps, can ids, (n, 8) frames), 8-byte frames only
+    with open(path) as f:
+        rows = CANDUMP_LINE.findall(f.read())
+    if not rows:
+        return np.empty(0), np.empty(0, dtype=np.uint32), np.empty((0, 8), dtype=np.uint8)
+    timestamps, ids, data = zip(*rows)
+    frames = np.frombuffer(bytes.fromhex("".join(data)), dtype=np.uint8).reshape(-1, 8)
+    return np.array(timestamps, dtype=np.float64), np.array([int(i, 16) for i in ids], dtype=np.uint32), frames
+
+
+if __name__ == "__main__":
+    # decode cost: per-frame Python loop against decode_frames
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=1_000_000)
+    parser.add_argument("--candump", default=None, help="Also decode the replies in a candump -tz log")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    pids = np.array(sorted(J1979), dtype=np.uint8)[rng.integers(0, len(J1979), args.frames)]
+    frames = rng.integers(0, 256, (args.frames, 8), dtype=np.uint8)
+    frames[:, 0] = 6
+    frames[:, 1] = 0x41
+    frames[:, 2] = pids
+
+    start = time.perf_counter()
+    _, values = decode_frames(frames)
+    vectorized = time.perf_counter() - start
+
+    sample = frames[:100_000]
+    start = time.perf_counter()
+    looped = [decode(row[2], bytes(row[3:])) for row in sample]
+    loop = (time.perf_counter() - start) * len(frames) / len(sample)
+    assert np.allclose(values[:len(looped)], np.array(looped, dtype=np.float64))
+
+    print(f"\n=== Decode {args.frames} mode 01 frames ===")
+    print(f"Python loop (extrapolated): {loop * 1000:10.1f} ms")
+    print(f"decode_frames:              {vectorized * 1000:10.1f} ms  ({loop / vectorized:.0f}x)")
+
+    if args.candump:
+        _, ids, frames = read_candump(args.candump)
+        replies = frames[(ids >= 0x7E8) & (ids <= 0x7EF)]
+        pids, values = decode_frames(replies)
+        print(f"\n{args.candump}: {len(frames)} frames, {len(replies)} replies")
+        for pid in np.unique(pids):
+            v = values[pids == pid]
+            if not np.isnan(v).all():
+                print(f"  0x{pid:02X} {name(pid):<22} n={len(v):<7} {np.nanmin(v):g}..{np.nanmax(v):g} {codec(pid).unit}")
+        columns = export_columns(pids, values)
+        print(f"obd_export columns: {', '.join(f'{field} ({len(v)})' for field, v in columns.items()) or 'none'}")
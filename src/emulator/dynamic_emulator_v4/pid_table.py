@@ -0,0 +1,131 @@
+import can
+
+REQUEST_ID = 0x7DF
+RESPONSE_ID = 0x7E8
+PHYSICAL_ID = 0x7E0  # physical request ID of the 0x7E8 ECU
+
+
+def request_filters(physical_id=PHYSICAL_ID, physical_mask=0x7FF):
+    # can_filters for can.Bus: the kernel drops everything but tester requests (including
+    # our own replies), so user space only wakes up for frames it has to answer.
+    # physical_id=None: functional 0x7DF requests only, for responders that ignore the rest
+    filters = [{"can_id": REQUEST_ID, "can_mask": 0x7FF, "extended": False}]
+    if physical_id is not None:
+        filters.append({"can_id": physical_id, "can_mask": physical_mask, "extended": False})
+    return filters
+
+
+# Value handlers are looked up by table[mode][pid] and only patch the value
+# bytes of a prebuilt frame, the header and padding are written once at register time.
+
+
+class PidTable:
+    def __init__(self, response_id=RESPONSE_ID, flag=None):
+        self.response_id = response_id
+        self.flag = flag
+        self.tables = [None] * 256
+
+    def _table(self, mode):
+        table = self.tables[mode]
+        if table is None:
+            table = [None] * 256
+            self.tables[mode] = table
+        return table
+
+    def _message(self, data):
+        return can.Message(arbitration_id=self.response_id, data=data, is_extended_id=False)
+
+    def _template(self, mode, pid, size):
+        frame = bytearray(8)
+        frame[0] = size + 2
+        frame[1] = mode + 0x40
+        frame[2] = pid
+        if self.flag is not None and size <= 4:
+            frame[7] = self.flag
+        return frame
+
+    def register(self, mode, pid, size, handler):
+        # handler() returns the raw integer value, big endian over `size` bytes
+        frame = self._template(mode, pid, size)
+        self._table(mode)[pid] = (handler, size, self._message(frame))
+
+    def register_static(self, mode, pid, payload):
+        frame = self._template(mode, pid, len(payload))
+        frame[3:3 + len(payload)] = bytes(payload)
+        self._table(mode)[pid] = (None, 0, self._message(frame))
+
+    def register_frame(self, mode, pid, data):
+        self._table(mode)[pid] = (None, 0, self._message(bytearray(data)))
+
+    def supports(self, mode, pid):
+        table = self.tables[mode]
+        return table is not None and table[pid] is not None
+
+    def value_size(self, mode, pid):
+        # value bytes in this PID's reply, None when unsupported
+        table = self.tables[mode]
+        slot = table[pid] if table is not None else None
+        return slot[2].data[0] - 2 if slot is not None else None
+
+    def pids(self, mode):
+        table = self.tables[mode]
+        if table is None:
+            return []
+        return [pid for pid in range(256) if table[pid] is not None]
+
+    def register_support_masks(self, mode=0x01):
+        # PIDs 0x00, 0x20, 0x40... advertise the PIDs registered in the next 32 slots
+        supported = set(self.pids(mode))
+        top = max(supported, default=0)
+        for base in range(0, 0x100, 0x20):
+            if base > top:
+                break
+            mask = 0
+            for bit in range(32):
+                pid = base + bit + 1
+                if pid in supported or (bit == 31 and pid <= top):
+                    mask |= 1 << (31 - bit)
+            self.register_static(mode, base, [(mask >> 24) & 0xFF, (mask >> 16) & 0xFF, (mask >> 8) & 0xFF, mask & 0xFF])
+
+    def respond(self, mode, pid):
+        table = self.tables[mode]
+        if table is None:
+            return None
+        slot = table[pid]
+        if slot is None:
+            return None
+        handler, size, msg = slot
+        if size:
+            value = handler()
+            data = msg.data
+            if size == 1:
+                data[3] = value & 0xFF
+            elif size == 2:
+                data[3] = (value >> 8) & 0xFF
+                data[4] = value & 0xFF
+            else:
+                for i in range(size):
+                    data[3 + i] = (value >> (8 * (size - 1 - i))) & 0xFF
+        return msg
+
+    def respond_many(self, mode, pids, answered=None):
+        # Multi-PID request (up to six PIDs): one payload [0x40 + mode, pid, value..., pid, value...]
+        # for ISO-TP, unsupported PIDs are left out. answered: list that receives (pid, msg)
+        # per PID included, msg being the single-PID frame respond() just wrote
+        payload = [mode + 0x40]
+        for pid in pids:
+            msg = self.respond(mode, pid)
+            if msg is None or msg.data[1] != mode + 0x40:
+                continue
+            payload += msg.data[2:msg.data[0] + 1]
+            if answered is not None:
+                answered.append((pid, msg))
+        return payload
+
+    def value_of(self, msg):
+        # decode what respond() just wrote, for the min/max bookkeeping
+        size = msg.data[0] - 2
+        value = 0
+        for i in range(min(size, 5)):
+            value = (value << 8) | msg.data[3 + i]
+        return value
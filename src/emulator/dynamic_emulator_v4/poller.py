@@ -0,0 +1,276 @@
+import csv
+import time
+import argparse
+from collections import defaultdict
+from datetime import datetime
+
+import can
+
+from pid_table import REQUEST_ID, RESPONSE_ID, PHYSICAL_ID
+from fmc_pids import FMC003_POLL_SEQUENCE, build_table, make_phase, VIN
+from isotp import IsoTpReceiver, FIRST_FRAME
+from obd_server import ObdServer
+from sim_clock import RealClock, SimClock, SimNetwork
+from timers import TimerQueue
+from timing_stats import summarize
+import pid_codec
+
+# Stand-in for the FMC003 tester: the mode 01 sequence of dynamic_emulator_v2/test_23_*/canlog.txt
+# (one request every ~75 ms, 05 06 0A ... 5E 01 04) plus a mode 03 DTC read every ~160 s.
+# A request waits up to --timeout-ms for its reply and is retried on the next slot, so the
+# cadence stays on absolute slots like the device's. Every request is recorded with its
+# attempt, turnaround and pid_codec (J1979) value. Pollers are event driven (on_message +
+# call_later), so many of them share one receive loop, on a real bus or in simulated time.
+
+# Capture order: the FMC003 sequence, then monitor status and engine load
+CAPTURE_SEQUENCE = FMC003_POLL_SEQUENCE + [0x01, 0x04]
+
+OK = "ok"
+TIMEOUT = "timeout"
+NEGATIVE = "negative"
+
+
+class Poller:
+    # results: (poller, request time, mode, pid, attempt, status, turnaround s, reply bytes, value)
+    def __init__(self, bus, call_later, clock, sequence=CAPTURE_SEQUENCE, interval=0.075, timeout=0.05,
+                 retries=1, dtc_interval=None, offset=0.0, index=0, results=None):
+        self.bus = bus
+        self.call_later = call_later
+        self.clock = clock
+        self.sequence = sequence
+        self.interval = interval
+        self.timeout = timeout
+        self.retries = retries
+        self.dtc_interval = dtc_interval
+        self.offset = offset
+        self.index = index
+        self.results = [] if results is None else results
+        self.receivers = {}  # response ID -> IsoTpReceiver, flow control to that ECU's physical ID
+        self.request = can.Message(arbitration_id=REQUEST_ID, data=bytearray(8), is_extended_id=False)
+        self.position = 0
+        self.slot = 0
+        self.start = None
+        self.next_dtc = None
+        self.pending = None  # (token, mode, pid, attempt, sent)
+        self.token = 0
+
+    def start_polling(self):
+        self.start = self.clock() + self.offset
+        if self.dtc_interval:
+            self.next_dtc = self.start + self.dtc_interval * 0.4  # first read ~64 s in, as captured
+        self.call_later(self.offset, self.poll)
+
+    def poll(self, retry=None):
+        now = self.clock()
+        if retry is not None:
+            mode, pid, attempt = retry
+        elif self.next_dtc is not None and now >= self.next_dtc:
+            mode, pid, attempt = 0x03, None, 1
+            self.next_dtc += self.dtc_interval
+        else:
+            mode, pid, attempt = 0x01, self.sequence[self.position], 1
+            self.position = (self.position + 1) % len(self.sequence)
+        data = self.request.data
+        if mode == 0x01:
+            data[:3] = bytes((0x02, 0x01, pid))
+        else:
+            data[:3] = bytes((0x01, 0x03, 0x00))
+        self.bus.send(self.request)
+        self.token += 1
+        self.pending = (self.token, mode, pid, attempt, now)
+        self.call_later(self.timeout, self.on_timeout, self.token)
+
+    def schedule_next(self, retry=None):
+        # next slot on the absolute grid; a slow reply pushes us to the first free one
+        now = self.clock()
+        self.slot += 1
+        due = self.start + self.slot * self.interval
+        if due < now:
+            self.slot = int((now - self.start) / self.interval) + 1
+            due = self.start + self.slot * self.interval
+        self.call_later(due - now, self.poll, retry)
+
+    def on_timeout(self, token):
+        if self.pending is None or self.pending[0] != token:
+            return
+        _, mode, pid, attempt, sent = self.pending
+        self.pending = None
+        self.record(sent, mode, pid, attempt, TIMEOUT, None, b"", None)
+        self.schedule_next((mode, pid, attempt + 1) if attempt <= self.retries else None)
+
+    def on_message(self, msg):
+        # True when the frame completed this poller's request, so nobody else takes the reply
+        if self.pending is None or not RESPONSE_ID <= msg.arbitration_id < RESPONSE_ID + 8:
+            return False
+        # only the poller that asked for the DTCs answers the first frame with flow control
+        if msg.data and msg.data[0] & 0xF0 == FIRST_FRAME and self.pending[1] != 0x03:
+            return False
+        self.receiver(msg.arbitration_id).on_message(msg)
+        return self.pending is None
+
+    def receiver(self, response_id):
+        # one per ECU: 0x7E8 + n gets its flow control on 0x7E0 + n, and segmented replies
+        # from several ECUs reassemble side by side
+        receiver = self.receivers.get(response_id)
+        if receiver is None:
+            receiver = self.receivers[response_id] = IsoTpReceiver(
+                self.bus, [response_id], response_id - RESPONSE_ID + PHYSICAL_ID, self.on_payload, self.call_later)
+        return receiver
+
+    def on_payload(self, payload, arbitration_id):
+        if self.pending is None:
+            return
+        _, mode, pid, attempt, sent = self.pending
+        if payload[0] == 0x7F and len(payload) > 1 and payload[1] == mode:
+            status, value, data = NEGATIVE, None, bytes(payload)
+        elif mode == 0x01 and payload[0] == 0x41 and len(payload) > 1 and payload[1] == pid:
+            data = bytes(payload[2:])
+            status, value = OK, pid_codec.decode(pid, data, exact=True)
+        elif mode == 0x03 and payload[0] == 0x43:
+            data = bytes(payload[1:])
+            status, value = OK, data[0] if data else 0
+        else:
+            return  # someone else's reply
+        self.pending = None
+        self.record(sent, mode, pid, attempt, status, self.clock() - sent, data, value)
+        self.schedule_next()
+
+    def record(self, sent, mode, pid, attempt, status, turnaround, data, value):
+        self.results.append((self.index, sent, mode, pid, attempt, status, turnaround, data, value))
+
+
+def summary_rows(results):
+    by_pid = defaultdict(list)
+    for row in results:
+        by_pid[(row[2], row[3])].append(row)
+    for (mode, pid), rows in sorted(by_pid.items(), key=lambda item: (item[0][0], item[0][1] or 0)):
+        turnarounds = [row[6] for row in rows if row[5] == OK]
+        s = summarize(turnarounds)
+        values = [row[8] for row in rows if row[8] is not None]
+        name = "DTCs" if mode == 0x03 else pid_codec.name(pid)
+        yield {
+            "Mode": f"{mode:02X}", "PID": "" if pid is None else f"{pid:02X}", "Name": name,
+            "Requests": len(rows), "Ok": len(turnarounds),
+            "Timeouts": sum(row[5] == TIMEOUT for row in rows),
+            "Negative": sum(row[5] == NEGATIVE for row in rows),
+            "Retries": sum(row[4] > 1 for row in rows),
+            "P50Ms": f"{s['p50'] * 1000:.3f}", "P99Ms": f"{s['p99'] * 1000:.3f}", "MaxMs": f"{s['max'] * 1000:.3f}",
+            "MinValue": f"{min(values):g}" if values else "", "MaxValue": f"{max(values):g}" if values else "",
+        }
+
+def write_results(prefix, results, start):
+    log_filename = f"{prefix}_requests.csv"
+    with open(log_filename, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Poller", "RequestSec", "Mode", "PID", "Attempt", "Status", "TurnaroundMs", "Data", "Value"])
+        for poller, sent, mode, pid, attempt, status, turnaround, data, value in results:
+            writer.writerow([poller, f"{sent - start:.6f}", f"{mode:02X}", "" if pid is None else f"{pid:02X}",
+                             attempt, status, "" if turnaround is None else f"{turnaround * 1000:.3f}",
+                             data.hex(" ").upper(), "" if value is None else f"{value:g}"])
+    rows = list(summary_rows(results))
+    summary_filename = f"{prefix}_summary.csv"
+    with open(summary_filename, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=list(rows[0]) if rows else ["PID"])
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows, log_filename, summary_filename
+
+def print_results(rows):
+    print(f"\n{'Mode':<6}{'PID':<5}{'Name':<26}{'Req':>7}{'Ok':>7}{'T/O':>6}{'Neg':>5}{'Retry':>7}"
+          f"{'p50 ms':>9}{'p99 ms':>9}  Values")
+    for r in rows:
+        print(f"{r['Mode']:<6}{r['PID']:<5}{r['Name']:<26}{r['Requests']:>7}{r['Ok']:>7}{r['Timeouts']:>6}"
+              f"{r['Negative']:>5}{r['Retries']:>7}{r['P50Ms']:>9}{r['P99Ms']:>9}  {r['MinValue']}..{r['MaxValue']}")
+    requests = sum(r["Requests"] for r in rows)
+    timeouts = sum(r["Timeouts"] for r in rows)
+    print(f"Total: {requests} requests, {timeouts} timeouts ({timeouts / max(requests, 1) * 100:.2f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channel", default="vcan0")
+    parser.add_argument("--interface", default="socketcan")
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--pollers", type=int, default=1, help="Independent pollers sharing the bus, slots staggered")
+    parser.add_argument("--interval-ms", type=float, default=75, help="Request slot length (capture: ~75 ms)")
+    parser.add_argument("--timeout-ms", type=float, default=50, help="Reply timeout per attempt")
+    parser.add_argument("--retries", type=int, default=1, help="Extra attempts after a timeout")
+    parser.add_argument("--dtc-interval-sec", type=float, default=160, help="Mode 03 read period, 0 = never")
+    parser.add_argument("--pids", default=None, help="Comma-separated hex PIDs instead of the captured order")
+    parser.add_argument("--simulate", action="store_true",
+                        help="Simulated clock and bus with the fmc_pids responder in-process, no vcan needed")
+    parser.add_argument("--seed", type=int, default=None, help="Responder noise seed in --simulate")
+    parser.add_argument("--prefix", default="poller")
+    args = parser.parse_args()
+
+    sequence = [int(p, 16) for p in args.pids.split(",")] if args.pids else CAPTURE_SEQUENCE
+    interval = args.interval_ms / 1000
+    duration = args.minutes * 60
+    results = []
+
+    def dispatch(msg):
+        # a reply answers one request: the oldest outstanding one it matches
+        for poller in sorted((p for p in pollers if p.pending is not None), key=lambda p: p.pending[4]):
+            if poller.on_message(msg):
+                break
+
+    if args.simulate:
+        clock = SimClock(time.time())
+        network = SimNetwork(clock)
+        bus = network.bus(listener=dispatch)
+        call_later = clock.call_later
+        # the responder side in-process: fmc_pids table behind ObdServer, phases on simulated time
+        server_bus = network.bus()
+        table = build_table(RESPONSE_ID, None, make_phase(clock.time(), clock.time), args.seed)
+        server = ObdServer(server_bus, table, VIN, clock.call_later)
+        server_bus.listener = server.on_message
+    else:
+        clock = RealClock()
+        bus = can.Bus(channel=args.channel, interface=args.interface,
+                      can_filters=[{"can_id": RESPONSE_ID, "can_mask": 0x7F8, "extended": False}])
+        timers = TimerQueue(clock.time)
+        call_later = timers.call_later
+
+    now = clock.time
+    pollers = [Poller(bus, call_later, now, sequence, interval, args.timeout_ms / 1000, args.retries,
+                      args.dtc_interval_sec if i == 0 else None, i * interval / args.pollers, i, results)
+               for i in range(args.pollers)]
+    start = now()
+    for poller in pollers:
+        poller.start_polling()
+
+    mode = "simulated" if args.simulate else args.channel
+    print(f"Polling {len(sequence)} PIDs every {args.interval_ms:g} ms with {args.pollers} poller(s) "
+          f"for {args.minutes:g} min ({mode}). Press Ctrl+C to stop.")
+    wall_start = time.monotonic()
+    try:
+        if args.simulate:
+            clock.run_until(start + duration)
+        else:
+            while now() - start < duration:
+                msg = bus.recv(timeout=timers.timeout(0.1))
+                if msg is not None:
+                    dispatch(msg)
+                timers.run_due()
+    except KeyboardInterrupt:
+        print("Poller stopped manually.")
+    finally:
+        bus.shutdown()
+
+    prefix = datetime.now().strftime(f'{args.prefix}_%d_%m_%H_%M')
+    rows, log_filename, summary_filename = write_results(prefix, results, start)
+    print_results(rows)
+    print(f"{now() - start:.1f} s polled in {time.monotonic() - wall_start:.1f} s wall time")
+    print(f"Requests written to {log_filename}, summary to {summary_filename}")
+
+"""
+Against the emulator on vcan (no FMC003 needed):
+    python3 dynamic_emulator.py        # CHANNEL = "vcan0"
+    python3 poller.py --channel vcan0 --minutes 10
+
+Stress the responder with 20 staggered pollers at a 20 ms slot:
+    python3 poller.py --channel vcan0 --pollers 20 --interval-ms 20 --timeout-ms 15
+
+Whole pipeline in simulated time (seconds for a 40 minute run):
+    python3 poller.py --simulate --minutes 40 --seed 1
+"""
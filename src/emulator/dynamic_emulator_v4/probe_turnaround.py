@@ -0,0 +1,48 @@
+import time
+import argparse
+import can
+
+from pid_table import REQUEST_ID
+from ramp_pids import PID_MAP, BLOCKED_PIDS
+from timing_stats import print_turnaround
+
+# Tester-side probe: one 0x7DF request at a time, waits for the matching 0x41 reply
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--channel", default="vcan0")
+parser.add_argument("--interface", default="socketcan")
+parser.add_argument("--count", type=int, default=1000)
+parser.add_argument("--interval-ms", type=float, default=0, help="Pause between requests")
+parser.add_argument("--timeout", type=float, default=0.5)
+args = parser.parse_args()
+
+pids = [pid for pid in PID_MAP if pid not in BLOCKED_PIDS]
+bus = can.Bus(channel=args.channel, interface=args.interface,
+              can_filters=[{"can_id": 0x7E8, "can_mask": 0x7F8, "extended": False}])
+samples = []
+timeouts = 0
+
+try:
+    for i in range(args.count):
+        pid = pids[i % len(pids)]
+        sent = time.perf_counter()
+        bus.send(can.Message(arbitration_id=REQUEST_ID, data=[0x02, 0x01, pid, 0, 0, 0, 0, 0], is_extended_id=False))
+        deadline = sent + args.timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                timeouts += 1
+                break
+            msg = bus.recv(timeout=remaining)
+            if msg and msg.data[1] == 0x41 and msg.data[2] == pid:
+                samples.append(time.perf_counter() - sent)
+                break
+        if args.interval_ms:
+            time.sleep(args.interval_ms / 1000)
+except KeyboardInterrupt:
+    pass
+finally:
+    bus.shutdown()
+
+print(f"\n=== Probe on {args.channel}: {len(samples)} answered, {timeouts} timed out ===")
+print_turnaround("request -> response", samples)
@@ -0,0 +1,64 @@
+from pid_table import PidTable, RESPONSE_ID
+from pid_codec import codec
+
+# PID config and ranges from dynamic_emulator_v2/test22_10min.py
+PID_MAP = {
+    0x0C: "RPM",
+    0x0D: "Speed",
+    0x46: "AirTemp",
+    0x4E: "FuelRate",
+    0x31: "DTC_Distance",
+    0x04: "EngineLoad",
+    0x05: "CoolantTemp",
+    0x5C: "OilTemp",
+    0x2F: "FuelLevel",
+}
+BLOCKED_PIDS = {0x52}
+
+RANGES = {
+    0x0C: (1200, 3000),
+    0x0D: (0, 100),
+    0x46: (10, 35),
+    0x4E: (0, 7),
+    0x31: (0, 10000),
+    0x04: (10, 80),
+    0x05: (60, 100),
+    0x5C: (70, 110),
+    0x2F: (20, 80),
+}
+
+# test22's bytes: J1979 where it agrees, its own scaling where it does not
+CODECS = {pid: codec(pid) for pid in PID_MAP}
+CODECS.update({
+    0x04: codec(0x04).variant(scale=1),        # load in raw percent, not /2.55
+    0x05: codec(0x05).variant(offset=0),       # temperatures without the -40 offset
+    0x46: codec(0x46).variant(offset=0),
+    0x5C: codec(0x5C).variant(offset=0),
+    0x2F: codec(0x2F).variant(scale=1),
+    0x4E: codec(0x4E).variant(name="Fuel rate", unit="L/h", scale=100),  # value*100 on 0x4E
+})
+
+def ramp_value(pid, progress):
+    low, high = RANGES[pid]
+    if pid == 0x31:
+        return high * progress
+    if pid == 0x2F:
+        return high - (high - low) * progress
+    return low + (high - low) * progress
+
+def raw_to_value(pid, raw):
+    return CODECS[pid].decode_raw(raw)
+
+def generators(total_ticks):
+    # pid -> fn(tick) for value_provider.ValueProvider
+    return {pid: (lambda tick, pid=pid: ramp_value(pid, min(1.0, tick / total_ticks)))
+            for pid in PID_MAP if pid not in BLOCKED_PIDS}
+
+def build_table(provider, response_id=RESPONSE_ID, flag=None):
+    # provider.get(pid) returns the engineering value for the current tick
+    table = PidTable(response_id, flag)
+    for pid, c in CODECS.items():
+        if pid in BLOCKED_PIDS:
+            continue
+        table.register(0x01, pid, c.size, lambda pid=pid, encode=c.encode: encode(provider.get(pid)))
+    return table
@@ -0,0 +1,151 @@
+import gc
+import os
+import time
+import ctypes
+import socket
+
+from timing_stats import summarize
+
+# Opt-in real-time setup for soak runs. Every step is best effort: whatever the host or
+# the user's privileges do not allow is reported and skipped, never fatal.
+#   pin_cpus      sched_setaffinity for every thread of the process (and threads started later)
+#   set_fifo      SCHED_FIFO at the given priority for every thread (needs CAP_SYS_NICE)
+#   socket_buffers SO_RCVBUF/SO_SNDBUF on the CAN socket (the *FORCE variants when root)
+#   lock_memory   mlockall(MCL_CURRENT | MCL_FUTURE), no page faults in the hot loop
+#   GcWindow      automatic GC off; every generation collected only in idle windows
+
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+SO_SNDBUFFORCE = getattr(socket, "SO_SNDBUFFORCE", 32)
+SO_RCVBUFFORCE = getattr(socket, "SO_RCVBUFFORCE", 33)
+
+
+def thread_ids():
+    try:
+        return [int(tid) for tid in os.listdir("/proc/self/task")]
+    except OSError:
+        return [0]
+
+def pin_cpus(cpus):
+    for tid in thread_ids():
+        os.sched_setaffinity(tid, cpus)
+    return f"pinned to CPUs {sorted(os.sched_getaffinity(0))}"
+
+def set_fifo(priority):
+    param = os.sched_param(priority)
+    for tid in thread_ids():
+        os.sched_setscheduler(tid, os.SCHED_FIFO, param)
+    return f"SCHED_FIFO priority {priority}"
+
+def socket_buffers(sock, size):
+    for option, force in ((socket.SO_RCVBUF, SO_RCVBUFFORCE), (socket.SO_SNDBUF, SO_SNDBUFFORCE)):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, force, size)
+        except OSError:
+            sock.setsockopt(socket.SOL_SOCKET, option, size)  # capped at net.core.*mem_max
+    # the kernel reports twice the requested value (bookkeeping overhead)
+    return (f"SO_RCVBUF={sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)} "
+            f"SO_SNDBUF={sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)}")
+
+def lock_memory():
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+        raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+    return "memory locked"
+
+
+class GcWindow:
+    # gc.freeze() moves everything allocated during setup out of the collector's reach;
+    # afterwards idle() runs a generation-0 collection only once enough objects piled up,
+    # a generation-1 collection every `young_per_old` of those, and a full one once
+    # `old_per_full` generation-1 collections went by (gc.get_count()[2]), so cycles that
+    # live long enough to reach generation 2 are still freed.
+    def __init__(self, threshold=700, young_per_old=10, old_per_full=10):
+        self.threshold = threshold
+        self.young_per_old = young_per_old
+        self.old_per_full = old_per_full
+        self.collections = 0
+        self.by_generation = [0, 0, 0]
+        self.collect_sec = 0.0
+        self.full_max_sec = 0.0
+        self.enabled = False
+
+    def start(self):
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+        self.enabled = True
+
+    def idle(self):
+        if not self.enabled or gc.get_count()[0] < self.threshold:
+            return
+        start = time.perf_counter()
+        self.collections += 1
+        if gc.get_count()[2] >= self.old_per_full:
+            generation = 2
+        else:
+            generation = 1 if self.collections % self.young_per_old == 0 else 0
+        gc.collect(generation)
+        elapsed = time.perf_counter() - start
+        self.by_generation[generation] += 1
+        self.collect_sec += elapsed
+        if generation == 2:
+            self.full_max_sec = max(self.full_max_sec, elapsed)
+
+    def stop(self):
+        if self.enabled:
+            gc.unfreeze()
+            gc.enable()
+            self.enabled = False
+
+    def report(self):
+        young, old, full = self.by_generation
+        return (f"GC in idle windows: {self.collections} collections ({young} gen 0, {old} gen 1, {full} gen 2, "
+                f"longest gen 2 {self.full_max_sec * 1000:.1f} ms), {self.collect_sec * 1000:.1f} ms total")
+
+
+def apply(cpus=None, fifo_priority=None, sock=None, buffer_bytes=None, mlock=False):
+    # returns one line per step, "<step>: <result or error>"
+    steps = []
+    if cpus:
+        steps.append(("affinity", lambda: pin_cpus(cpus)))
+    if fifo_priority:
+        steps.append(("scheduler", lambda: set_fifo(fifo_priority)))
+    if sock is not None and buffer_bytes:
+        steps.append(("socket", lambda: socket_buffers(sock, buffer_bytes)))
+    if mlock:
+        steps.append(("mlockall", lock_memory))
+    report = []
+    for name, step in steps:
+        try:
+            report.append(f"{name}: {step()}")
+        except (OSError, AttributeError) as error:
+            report.append(f"{name}: skipped ({error})")
+    return report
+
+
+def measure_jitter(duration_sec=2.0, period_sec=0.001, garbage=True, idle=None):
+    # wake-up lateness against absolute deadlines, the same thing the responder's
+    # call_later pacing and the deadline scheduler depend on; `garbage` allocates a little
+    # every cycle like the request path does, so GC pauses show up too
+    lateness = []
+    keep = []
+    next_deadline = time.perf_counter() + period_sec
+    end = next_deadline + duration_sec
+    while next_deadline < end:
+        delay = next_deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        lateness.append(time.perf_counter() - next_deadline)
+        if garbage:
+            keep.append([{} for _ in range(20)])
+            if len(keep) > 50:
+                keep.pop(0)
+        if idle:
+            idle()
+        next_deadline += period_sec
+    return summarize(lateness)
+
+def print_jitter(label, s):
+    print(f"{label}: n={s['count']} p50={s['p50'] * 1e6:.0f} us p90={s['p90'] * 1e6:.0f} us "
+          f"p99={s['p99'] * 1e6:.0f} us max={s['max'] * 1e6:.0f} us")
@@ -0,0 +1,113 @@
+import re
+import time
+import errno
+import argparse
+import can
+
+from pid_table import REQUEST_ID
+from timing_stats import print_turnaround
+
+# Replays a capture onto a (v)can interface: `candump -tz` text like
+# dynamic_emulator_v2/test_23_*/canlog.txt, or BLF/ASC files (capture.py) through python-can's
+# readers. Frames go out on absolute deadlines from the start, at the original pace,
+# --speed times faster, or as fast as possible (--afap).
+#   python3 replay.py ../dynamic_emulator_v2/test_23_25_05_20_08/canlog.txt --channel vcan0 --speed 100
+
+CANDUMP_TZ = re.compile(r"^\s*\((\d+\.\d+)\)\s+(\S+)\s+([0-9A-Fa-f]+)\s+\[(\d+)\]\s*((?:[0-9A-Fa-f]{2}\s*)*)$")
+SIDES = ("all", "requests", "responses")
+SPIN_SEC = 0.0002  # busy-wait the last bit before a deadline, sleep() overshoots at x100
+
+
+def read_candump_tz(path):
+    with open(path) as f:
+        for line in f:
+            match = CANDUMP_TZ.match(line)
+            if not match:
+                continue
+            timestamp, _, can_id, dlc, data = match.groups()
+            payload = bytes.fromhex(data)[:int(dlc)]
+            yield can.Message(timestamp=float(timestamp), arbitration_id=int(can_id, 16),
+                              is_extended_id=len(can_id) > 3, data=payload)
+
+def read_capture(path):
+    if path.lower().endswith((".blf", ".asc")):
+        return can.LogReader(path)
+    return read_candump_tz(path)
+
+def is_request(can_id):
+    return can_id == REQUEST_ID or 0x7E0 <= can_id <= 0x7E7
+
+def is_response(can_id):
+    return 0x7E8 <= can_id <= 0x7EF
+
+def side_filter(side):
+    if side == "requests":
+        return is_request
+    if side == "responses":
+        return is_response
+    return lambda can_id: True
+
+
+def send(bus, msg):
+    # vcan returns ENOBUFS when its queue is full at --afap; wait for room instead of losing frames
+    while True:
+        try:
+            bus.send(msg, timeout=0.5)
+            return
+        except can.CanOperationError as error:
+            if error.error_code not in (errno.ENOBUFS, None):
+                raise
+            time.sleep(0.0005)
+
+def replay(bus, messages, speed=1.0, afap=False, keep=lambda can_id: True):
+    lateness = []
+    sent = 0
+    first = last = None
+    start = time.perf_counter()
+    for msg in messages:
+        if not keep(msg.arbitration_id):
+            continue
+        if first is None:
+            first = msg.timestamp
+        last = msg.timestamp
+        if not afap:
+            deadline = start + (msg.timestamp - first) / speed
+            remaining = deadline - time.perf_counter()
+            if remaining > SPIN_SEC:
+                time.sleep(remaining - SPIN_SEC)
+            while time.perf_counter() < deadline:
+                pass
+            lateness.append(time.perf_counter() - deadline)
+        frame = can.Message(arbitration_id=msg.arbitration_id, is_extended_id=msg.is_extended_id, data=msg.data)
+        send(bus, frame)
+        sent += 1
+    original = last - first if first is not None else 0.0
+    return {"sent": sent, "wall": time.perf_counter() - start, "original": original, "lateness": lateness}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("capture", help="candump -tz text, .blf or .asc")
+    parser.add_argument("--channel", default="vcan0")
+    parser.add_argument("--interface", default="socketcan")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time scale: 10 or 100 replays 10x/100x faster")
+    parser.add_argument("--afap", action="store_true", help="As fast as possible, ignore timestamps")
+    parser.add_argument("--side", choices=SIDES, default="all",
+                        help="requests: 0x7DF/0x7E0-7E7 only (drive an emulator), responses: 0x7E8-7EF only (drive a tester)")
+    parser.add_argument("--loops", type=int, default=1)
+    args = parser.parse_args()
+
+    bus = can.Bus(channel=args.channel, interface=args.interface)
+    mode = "as fast as possible" if args.afap else f"x{args.speed:g}"
+    print(f"Replaying {args.capture} onto {args.channel} ({mode}, {args.side} frames)")
+    try:
+        for loop in range(args.loops):
+            r = replay(bus, read_capture(args.capture), args.speed, args.afap, side_filter(args.side))
+            print(f"Loop {loop + 1}: {r['sent']} frames, {r['original']:.1f} s of capture in {r['wall']:.2f} s "
+                  f"(x{r['original'] / max(r['wall'], 1e-9):.1f}), {r['sent'] / max(r['wall'], 1e-9):.0f} frames/s")
+            if r["lateness"]:
+                print_turnaround("  deadline lateness", r["lateness"])
+    except KeyboardInterrupt:
+        print("Replay stopped manually.")
+    finally:
+        bus.shutdown()
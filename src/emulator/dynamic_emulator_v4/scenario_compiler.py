@@ -0,0 +1,166 @@
+import os
+import json
+import glob
+import hashlib
+import tempfile
+import argparse
+import numpy as np
+
+import pid_codec
+
+# Turns a declarative scenario (scenarios/*.json) into a uint8 array of shape
+# (ticks, pids, 8) holding ready-to-send frames, so the send loop is an index lookup.
+#
+# Scenario keys:
+#   cycle_duration_sec, duration_min      tick length and run length
+#   ramp: {"shape": "triangle", "accel_min", "decel_min"} | {"shape": "linear"}
+#   flag                                  padding byte written to byte 7 (null = none)
+#   dtc_count                             default for PIDs with "shape": "dtc", --dtc overrides
+#   pids: [{"pid", "name", "bytes", "scale", "offset", "codec", "range": [start, end], "shape"}]
+# "codec": "j1979" takes bytes/scale/offset from pid_codec; without it the entry's own values
+# apply (defaults 1/1/0), which is how the legacy scripts' scaling is reproduced.
+# PID shapes: "ramp" (default, follows the scenario ramp), "runtime" (linear over the whole run),
+# "cycle" (raw tick index), "sawtooth" (+ "period_min", "hold_sec"), "dtc".
+
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")
+CACHE_DIR = os.path.join(SCENARIO_DIR, ".compiled")
+
+
+def load_scenario(path):
+    if not os.path.exists(path):
+        path = os.path.join(SCENARIO_DIR, path if path.endswith(".json") else path + ".json")
+    with open(path) as f:
+        scenario = json.load(f)
+    for entry in scenario["pids"]:
+        if isinstance(entry["pid"], str):
+            entry["pid"] = int(entry["pid"], 16)
+    scenario.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    scenario["path"] = path
+    return scenario
+
+def total_ticks(scenario):
+    return int(round(scenario["duration_min"] * 60 / scenario["cycle_duration_sec"]))
+
+def ramp_progress(scenario, ticks):
+    ramp = scenario.get("ramp", {"shape": "linear"})
+    cycles_per_minute = int(60 / scenario["cycle_duration_sec"])
+    if ramp["shape"] == "linear":
+        return ticks / len(ticks)
+    if ramp["shape"] == "triangle":
+        accel = ramp["accel_min"] * cycles_per_minute
+        decel = ramp["decel_min"] * cycles_per_minute
+        batch_index = ticks % (accel + decel)
+        return np.where(batch_index < accel, batch_index / accel, 1 - (batch_index - accel) / decel)
+    raise ValueError(f"Unknown ramp shape {ramp['shape']}")
+
+def pid_values(scenario, entry, ticks, progress, dtc_count):
+    shape = entry.get("shape", "ramp")
+    start, end = entry.get("range", (0, 0))
+    if shape == "ramp":
+        return start + (end - start) * progress
+    if shape == "runtime":
+        return start + (end - start) * (ticks / len(ticks))
+    if shape == "cycle":
+        return ticks.astype(np.float64)
+    if shape == "sawtooth":
+        period = entry["period_min"] * int(60 / scenario["cycle_duration_sec"])
+        hold = max(1, int(entry.get("hold_sec", 0) / scenario["cycle_duration_sec"]))
+        held = ticks - ticks % hold
+        return start + (end - start) * ((held % period) / period)
+    if shape == "dtc":
+        return np.full(len(ticks), dtc_count & 0x7F, dtype=np.float64)  # MIL off, bits 0-6 = count
+    raise ValueError(f"Unknown PID shape {shape}")
+
+def encoding(entry):
+    # (bytes, scale, offset) of a scenario PID
+    if entry.get("codec") == "j1979":
+        c = pid_codec.codec(entry["pid"])
+        return c.size, c.scale, c.offset
+    return entry.get("bytes", 1), entry.get("scale", 1), entry.get("offset", 0)
+
+def compile_scenario(scenario, out=None, dtc=None):
+    # out: path of a .npy file to write through a memory map, None keeps it in RAM
+    dtc_count = (scenario.get("dtc_count") or 0) if dtc is None else dtc
+    entries = scenario["pids"]
+    ticks = np.arange(total_ticks(scenario))
+    progress = ramp_progress(scenario, ticks)
+    shape = (len(ticks), len(entries), 8)
+    if out:
+        frames = np.lib.format.open_memmap(out, mode="w+", dtype=np.uint8, shape=shape)
+        frames[:] = 0
+    else:
+        frames = np.zeros(shape, dtype=np.uint8)
+
+    for j, entry in enumerate(entries):
+        size, scale, offset = encoding(entry)
+        values = pid_values(scenario, entry, ticks, progress, dtc_count)
+        # clamped like PidCodec.encode: a ramp past the top stays at the top, not wrapped
+        raw = np.clip((values + offset) * scale, 0, (1 << (8 * size)) - 1).astype(np.int64)
+        frames[:, j, 0] = size + 2
+        frames[:, j, 1] = 0x41
+        frames[:, j, 2] = entry["pid"]
+        for i in range(size):
+            frames[:, j, 3 + i] = (raw >> (8 * (size - 1 - i))) & 0xFF
+        if scenario.get("flag") is not None and size <= 4:
+            frames[:, j, 7] = scenario["flag"]
+
+    if out:
+        frames.flush()
+    return frames
+
+def decoders(scenario):
+    # pid -> (name, fn(frame bytes) -> engineering value), the inverse of compile_scenario
+    result = {}
+    for entry in scenario["pids"]:
+        size, scale, offset = encoding(entry)
+        result[entry["pid"]] = (entry.get("name", f"{entry['pid']:02X}"),
+                                lambda data, size=size, scale=scale, offset=offset:
+                                int.from_bytes(data[3:3 + size], "big") / scale - offset)
+    return result
+
+def cache_key(scenario, dtc=None):
+    # scenario JSON bytes + compiler sources: a copied or edited scenario, or a compiler
+    # change, never picks up somebody else's frames
+    digest = hashlib.sha1()
+    for path in (scenario["path"], __file__, pid_codec.__file__):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    digest.update(repr(dtc).encode())
+    return digest.hexdigest()[:16]
+
+def load_frames(scenario, dtc=None):
+    # Compiled tables are cached next to the scenarios and memory-mapped read-only
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    suffix = "" if dtc is None else f".dtc{dtc}"
+    cached = os.path.join(CACHE_DIR, f"{scenario['name']}{suffix}.{cache_key(scenario, dtc)}.npy")
+    if not os.path.exists(cached):
+        # compile beside it and rename, so an interrupted compile never leaves a truncated cache
+        fd, partial = tempfile.mkstemp(suffix=".npy.partial", dir=CACHE_DIR)
+        os.close(fd)
+        try:
+            compile_scenario(scenario, partial, dtc)
+            os.replace(partial, cached)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        # older compiles of the same scenario (not its --dtc variants)
+        pattern = glob.escape(scenario["name"] + suffix) + "." + "[0-9a-f]" * 16 + ".npy"
+        for stale in glob.glob(os.path.join(CACHE_DIR, pattern)):
+            if stale != cached:
+                os.remove(stale)
+    return np.load(cached, mmap_mode="r")
+
+def scenario_names():
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(SCENARIO_DIR) if name.endswith(".json"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scenarios", nargs="*", help="Scenario names or files (default: all)")
+    parser.add_argument("--dtc", type=int, default=None)
+    args = parser.parse_args()
+    for name in args.scenarios or scenario_names():
+        scenario = load_scenario(name)
+        frames = load_frames(scenario, args.dtc)
+        print(f"{scenario['name']}: {frames.shape[0]} ticks x {frames.shape[1]} PIDs "
+              f"({frames.nbytes / 1e6:.1f} MB) -> {frames.filename}")
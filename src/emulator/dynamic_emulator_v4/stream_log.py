@@ -0,0 +1,139 @@
+import os
+import glob
+import time
+import struct
+import argparse
+import threading
+from array import array
+
+# Request/response log with flat memory: the hot path appends fixed-size records to a
+# preallocated single-producer/single-consumer ring, a writer thread drains it on an
+# interval into rotating binary segments (<base>.00000.bin, <base>.00001.bin, ...).
+# Segments survive a crash; export_text() turns them into the test_21_requests_*.log format.
+
+REQUEST = 0
+RESPONSE = 1
+
+# elapsed seconds, kind, pid, value (raw response value, 0 for requests)
+RECORD = struct.Struct("<dBBd")
+
+
+class StreamLog:
+    def __init__(self, base, capacity=1 << 16, flush_interval=1.0, segment_bytes=16 << 20):
+        if capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.base = base
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.kinds = bytearray(capacity)
+        self.pids = bytearray(capacity)
+        # head is only written by the producer, tail only by the writer thread
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+        self.written = 0
+        self.segments = []
+        self.file = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="stream-log", daemon=True)
+        self.thread.start()
+
+    def append(self, elapsed, kind, pid, value=0.0):
+        head = self.head
+        if head - self.tail >= self.capacity:
+            self.dropped += 1  # writer fell behind a whole ring; never block the responder
+            return False
+        i = head & self.mask
+        self.times[i] = elapsed
+        self.kinds[i] = kind
+        self.pids[i] = pid
+        self.values[i] = value
+        self.head = head + 1
+        return True
+
+    def request(self, elapsed, pid):
+        return self.append(elapsed, REQUEST, pid)
+
+    def response(self, elapsed, pid, value):
+        return self.append(elapsed, RESPONSE, pid, value)
+
+    def run(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.drain()
+        self.drain()
+
+    def drain(self):
+        head = self.head
+        tail = self.tail
+        if head == tail:
+            return
+        chunk = bytearray(RECORD.size * (head - tail))
+        offset = 0
+        for n in range(tail, head):
+            i = n & self.mask
+            RECORD.pack_into(chunk, offset, self.times[i], self.kinds[i], self.pids[i], self.values[i])
+            offset += RECORD.size
+        self.tail = head
+        if self.file is None or self.file.tell() >= self.segment_bytes:
+            self.rotate()
+        self.file.write(chunk)
+        self.file.flush()
+        self.written += head - tail
+
+    def rotate(self):
+        if self.file is not None:
+            self.file.close()
+        path = f"{self.base}.{len(self.segments):05d}.bin"
+        self.segments.append(path)
+        self.file = open(path, 'wb')
+
+    def close(self):
+        self.stop_event.set()
+        self.thread.join()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def export_text(self, path, names, remove_segments=False):
+        export_text(self.segments, path, names)
+        if remove_segments:
+            for segment in self.segments:
+                os.remove(segment)
+
+
+def records(segments, chunk_records=4096):
+    for segment in segments:
+        with open(segment, 'rb') as f:
+            while True:
+                chunk = f.read(RECORD.size * chunk_records)
+                # a crash can leave a partial record at the end of the last segment
+                usable = len(chunk) - len(chunk) % RECORD.size
+                if not usable:
+                    break
+                yield from RECORD.iter_unpack(chunk[:usable])
+                if usable < len(chunk):
+                    break
+
+def export_text(segments, path, names):
+    # same lines as test22's request_log dump: "<elapsed>s PID=0x.. (name)"
+    with open(path, 'w') as out:
+        for elapsed, kind, pid, _ in records(segments):
+            if kind == REQUEST:
+                out.write(f"{elapsed:.2f}s PID=0x{pid:02X} ({names.get(pid, 'Unknown')})\n")
+
+
+if __name__ == "__main__":
+    # recover the text log from the segments of a crashed run
+    from ramp_pids import PID_MAP
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base", help="Segment prefix, e.g. test_21_requests_25_05_18_04")
+    parser.add_argument("--out", help="Default: <base>.log")
+    args = parser.parse_args()
+    segments = sorted(glob.glob(f"{glob.escape(args.base)}.*.bin"))
+    start = time.perf_counter()
+    export_text(segments, args.out or f"{args.base}.log", PID_MAP)
+    print(f"{len(segments)} segments -> {args.out or args.base + '.log'} in {time.perf_counter() - start:.2f} s")
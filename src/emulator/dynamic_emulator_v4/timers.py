@@ -0,0 +1,43 @@
+import heapq
+import itertools
+import time
+
+# call_later() for the blocking recv() loops, same shape as asyncio's so the
+# ISO-TP engine can be driven by either: recv(timeout=timers.timeout(1.0)), then run_due().
+
+
+class TimerHandle:
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerQueue:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.heap = []
+        self.counter = itertools.count()
+
+    def call_later(self, delay, callback, *args):
+        handle = TimerHandle(self.clock() + delay, callback, args)
+        heapq.heappush(self.heap, (handle.when, next(self.counter), handle))
+        return handle
+
+    def timeout(self, default):
+        while self.heap and self.heap[0][2].cancelled:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return default
+        return max(0.0, min(default, self.heap[0][0] - self.clock()))
+
+    def run_due(self):
+        now = self.clock()
+        while self.heap and self.heap[0][0] <= now:
+            _, _, handle = heapq.heappop(self.heap)
+            if not handle.cancelled:
+                handle.callback(*handle.args)
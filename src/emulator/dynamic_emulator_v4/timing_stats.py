@@ -0,0 +1,21 @@
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    index = int(round(q / 100 * (len(sorted_values) - 1)))
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50": percentile(ordered, 50),
+        "p90": percentile(ordered, 90),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else float('nan'),
+    }
+
+def print_turnaround(label, samples_sec):
+    s = summarize(samples_sec)
+    print(f"{label}: n={s['count']} p50={s['p50'] * 1000:.3f} ms p90={s['p90'] * 1000:.3f} ms "
+          f"p99={s['p99'] * 1000:.3f} ms max={s['max'] * 1000:.3f} ms")
+    return s
@@ -0,0 +1,130 @@
+import time
+import errno
+import threading
+from collections import deque
+
+import can
+
+# Bounded transmit queue in front of bus.send(): a sender thread drains it, responses to
+# tester requests always go before broadcast frames, and a full socket TX queue (ENOBUFS,
+# "Transmit buffer full") is retried with exponential backoff instead of killing the
+# script. Anything that cannot go out is dropped and counted. on_sent(frame, priority) is
+# called from the sender thread once a frame is on the bus; frame.timestamp is whatever the
+# caller put on the message it queued (dynamic_emulator: the request's receive time).
+
+RESPONSE = 0
+BROADCAST = 1
+
+TRANSIENT_ERRNOS = {errno.ENOBUFS, errno.EAGAIN}
+
+
+def is_transient(error):
+    return error.error_code in TRANSIENT_ERRNOS or (error.error_code is None and "buffer full" in str(error))
+
+
+class TxQueue:
+    def __init__(self, bus, maxsize=256, max_retries=8, backoff_sec=0.0005, max_backoff_sec=0.02, on_sent=None):
+        self.bus = bus
+        self.on_sent = on_sent
+        self.maxsize = maxsize
+        self.max_retries = max_retries
+        self.backoff_sec = backoff_sec
+        self.max_backoff_sec = max_backoff_sec
+        self.queues = (deque(), deque())  # indexed by RESPONSE / BROADCAST
+        self.ready = threading.Condition()
+        self.sent = [0, 0]
+        self.dropped = [0, 0]    # queue full, or retries exhausted
+        self.retries = 0
+        self.errors = 0          # non-transient send failures
+        self.max_depth = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="can-tx", daemon=True)
+        self.thread.start()
+
+    def depth(self):
+        return len(self.queues[RESPONSE]) + len(self.queues[BROADCAST])
+
+    def send(self, msg, timeout=None, priority=RESPONSE):
+        # Same signature as bus.send() so ObdServer/IsoTpSender can use the queue as their bus.
+        # The payload is copied: PidTable patches its shared messages in place.
+        frame = can.Message(timestamp=msg.timestamp, arbitration_id=msg.arbitration_id, data=bytes(msg.data),
+                            is_extended_id=msg.is_extended_id)
+        with self.ready:
+            if self.depth() >= self.maxsize:
+                broadcast = self.queues[BROADCAST]
+                if priority == RESPONSE and broadcast:
+                    broadcast.popleft()  # a stale broadcast frame makes room for a reply
+                    self.dropped[BROADCAST] += 1
+                else:
+                    self.dropped[priority] += 1
+                    return False
+            self.queues[priority].append(frame)
+            self.max_depth = max(self.max_depth, self.depth())
+            self.ready.notify()
+        return True
+
+    def send_broadcast(self, msg):
+        return self.send(msg, priority=BROADCAST)
+
+    def run(self):
+        while True:
+            with self.ready:
+                while self.running and not self.depth():
+                    self.ready.wait()
+                if not self.depth():
+                    return
+                priority = RESPONSE if self.queues[RESPONSE] else BROADCAST
+                frame = self.queues[priority].popleft()
+            self.transmit(frame, priority)
+
+    def transmit(self, frame, priority):
+        delay = self.backoff_sec
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.bus.send(frame)
+                self.sent[priority] += 1
+                if self.on_sent:
+                    self.on_sent(frame, priority)
+                return True
+            except can.CanOperationError as error:
+                if not is_transient(error):
+                    self.errors += 1
+                    break
+                if attempt == self.max_retries:
+                    break
+                self.retries += 1
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff_sec)
+        self.dropped[priority] += 1
+        return False
+
+    def stop(self, drain_timeout=1.0):
+        # let queued frames go out, then stop the sender thread
+        deadline = time.monotonic() + drain_timeout
+        while self.depth() and time.monotonic() < deadline:
+            time.sleep(0.005)
+        with self.ready:
+            self.running = False
+            for priority, queue in enumerate(self.queues):
+                self.dropped[priority] += len(queue)
+                queue.clear()
+            self.ready.notify()
+        self.thread.join()
+
+    def counters(self):
+        return {
+            "sent_responses": self.sent[RESPONSE],
+            "sent_broadcast": self.sent[BROADCAST],
+            "dropped_responses": self.dropped[RESPONSE],
+            "dropped_broadcast": self.dropped[BROADCAST],
+            "retries": self.retries,
+            "errors": self.errors,
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+        }
+
+    def print_counters(self):
+        c = self.counters()
+        print(f"TX queue: sent {c['sent_responses']} responses / {c['sent_broadcast']} broadcast, "
+              f"dropped {c['dropped_responses']} / {c['dropped_broadcast']}, {c['retries']} retries, "
+              f"{c['errors']} errors, max depth {c['max_depth']}")
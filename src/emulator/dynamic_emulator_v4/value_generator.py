@@ -0,0 +1,30 @@
+import os
+import random
+
+from deadline_scheduler import DeadlineScheduler
+from ramp_pids import generators
+from value_plane import ValuePlane
+
+# Generator side of the split emulator: runs in its own process and publishes every
+# PID value once per tick into the shared value plane. Heavy models live here, off the
+# responder's hot path.
+
+
+def run_generator(plane_name, tick_sec, total_ticks, stop, noise=0.0, seed=None):
+    plane = ValuePlane(plane_name)
+    models = generators(total_ticks)
+    rng = random.Random(seed)
+    scheduler = DeadlineScheduler(tick_sec)
+    try:
+        while not stop.is_set():
+            tick = min(scheduler.wait(), total_ticks)
+            for pid, model in models.items():
+                value = model(tick)
+                if noise:
+                    value = max(0.0, value * (1 + rng.gauss(0, noise)))
+                plane.write(pid, value)
+            plane.set_tick(tick + 1, os.getpid())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        plane.close()
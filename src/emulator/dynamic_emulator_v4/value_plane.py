@@ -0,0 +1,69 @@
+import os
+from multiprocessing import shared_memory
+
+# Latest value of every PID in shared memory, written by a generator process and read
+# lock-free by the responder. Each slot is a seqlock: [sequence u64][value f64]. The writer
+# makes the sequence odd, stores the value, makes it even again; a reader retries while the
+# sequence is odd or changed under it. Header: [generator tick u64][writer pid u64].
+# Words are accessed through typed memoryviews (one aligned 8-byte load/store each);
+# struct.unpack reads byte by byte and can tear a sequence number mid-update.
+
+HEADER_WORDS = 2
+SLOTS = 256
+SIZE = (HEADER_WORDS + 2 * SLOTS) * 8
+MAX_RETRIES = 100000
+YIELD_EVERY = 64  # give a preempted writer the CPU back
+
+
+class ValuePlane:
+    def __init__(self, name=None, create=False):
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=SIZE if create else 0)
+        self.name = self.shm.name
+        self.owner = create
+        self.buf = self.shm.buf[:SIZE]
+        if create:
+            self.buf[:] = bytes(SIZE)
+        self.words = self.buf.cast("Q")
+        self.floats = self.buf.cast("d")
+        self.retries = 0
+
+    def write(self, pid, value):
+        index = HEADER_WORDS + 2 * pid
+        words = self.words
+        seq = words[index]
+        words[index] = seq + 1
+        self.floats[index + 1] = value
+        words[index] = seq + 2
+
+    def read(self, pid):
+        # None until the generator has written this PID once
+        index = HEADER_WORDS + 2 * pid
+        words = self.words
+        for attempt in range(1, MAX_RETRIES + 1):
+            seq = words[index]
+            if not seq & 1:
+                value = self.floats[index + 1]
+                if words[index] == seq:
+                    return value if seq else None
+            self.retries += 1
+            if attempt % YIELD_EVERY == 0:
+                os.sched_yield()
+        raise RuntimeError(f"PID 0x{pid:02X}: value plane slot kept changing")
+
+    get = read  # same interface as value_provider.ValueProvider
+
+    def set_tick(self, tick, writer_pid=0):
+        self.words[1] = writer_pid
+        self.words[0] = tick
+
+    def tick(self):
+        return self.words[0]
+
+    def close(self):
+        self.words.release()
+        self.floats.release()
+        self.buf.release()
+        self.words = self.floats = self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,36 @@
+# PID values computed only when a PID is requested, at most once per scenario tick.
+# generators[pid](tick) returns the engineering value; tick_fn() returns the current tick.
+
+
+class ValueProvider:
+    def __init__(self, generators, tick_fn):
+        self.generators = generators
+        self.tick_fn = tick_fn
+        self.cached_tick = [-1] * 256
+        self.cached_value = [None] * 256
+        self.evaluations = [0] * 256
+        self.hits = [0] * 256
+
+    def get(self, pid):
+        tick = self.tick_fn()
+        if self.cached_tick[pid] == tick:
+            self.hits[pid] += 1
+            return self.cached_value[pid]
+        value = self.generators[pid](tick)
+        self.cached_tick[pid] = tick
+        self.cached_value[pid] = value
+        self.evaluations[pid] += 1
+        return value
+
+    def counters(self):
+        return {pid: {"evaluations": self.evaluations[pid], "hits": self.hits[pid]}
+                for pid in sorted(self.generators)}
+
+    def print_counters(self, names=None, ticks=None):
+        print("\n=== PID evaluations (lazy, memoized per tick) ===")
+        for pid, c in self.counters().items():
+            name = names.get(pid, "Unknown") if names else ""
+            line = f"{pid:02X} {name}: evaluated={c['evaluations']}, cache hits={c['hits']}"
+            if ticks:
+                line += f", eager would have evaluated {ticks}"
+            print(line)
@@ -0,0 +1,51 @@
+# Multi-frame service payloads (sent through isotp.IsoTpSender)
+
+DTC_LETTERS = {"P": 0, "C": 1, "B": 2, "U": 3}
+
+CALIBRATION_IDS = ["FMC003EMU000001"]
+STORED_DTCS = ["P0301", "P0420", "P0171"]
+
+
+def encode_dtc(code):
+    # "P0301" -> [0x03, 0x01]: 2 bits letter, then four hex digits
+    letter = DTC_LETTERS[code[0].upper()]
+    digits = int(code[1:], 16)
+    return [(letter << 6) | ((digits >> 8) & 0x3F), digits & 0xFF]
+
+def vin_payload(vin):
+    # mode 09 PID 02: one data item, 17 ASCII characters
+    return [0x49, 0x02, 0x01] + list(vin.encode('ascii')[:17])
+
+def calibration_payload(cal_ids=CALIBRATION_IDS):
+    # mode 09 PID 04: 16 bytes per calibration ID, zero padded
+    payload = [0x49, 0x04, len(cal_ids)]
+    for cal_id in cal_ids:
+        raw = list(cal_id.encode('ascii')[:16])
+        payload += raw + [0x00] * (16 - len(raw))
+    return payload
+
+def vehicle_info_support_payload(pids=(0x02, 0x04)):
+    mask = 0
+    for pid in pids:
+        mask |= 1 << (32 - pid)
+    return [0x49, 0x00, (mask >> 24) & 0xFF, (mask >> 16) & 0xFF, (mask >> 8) & 0xFF, mask & 0xFF]
+
+def stored_dtc_payload(dtcs=STORED_DTCS):
+    # mode 03: count, then two bytes per DTC
+    payload = [0x43, len(dtcs)]
+    for code in dtcs:
+        payload += encode_dtc(code)
+    return payload
+
+def service_payload(mode, pid, vin, dtcs=STORED_DTCS, cal_ids=CALIBRATION_IDS):
+    # Responses to non mode 01 requests, None when unsupported
+    if mode == 0x03:
+        return stored_dtc_payload(dtcs)
+    if mode == 0x09:
+        if pid == 0x00:
+            return vehicle_info_support_payload()
+        if pid == 0x02:
+            return vin_payload(vin)
+        if pid == 0x04:
+            return calibration_payload(cal_ids)
+    return None
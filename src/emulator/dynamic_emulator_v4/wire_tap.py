@@ -0,0 +1,105 @@
+import time
+import socket
+import struct
+import threading
+from collections import deque
+
+from pid_table import REQUEST_ID, RESPONSE_ID
+from metrics import LatencyHistogram
+
+# Passive SocketCAN tap that timestamps frames in the kernel (or in the controller, where
+# the driver supports hardware timestamps). It sees the tester's 0x7DF request and the
+# local echo of our 0x7E8 reply, which the driver loops back once the frame has been sent,
+# so reply_ts - request_ts is the turnaround as seen on the wire, without the Python
+# scheduling delay between recv() returning and bus.send().
+
+SO_TIMESTAMPING = getattr(socket, "SO_TIMESTAMPING", 37)
+SOF_TIMESTAMPING_RX_HARDWARE = 1 << 2
+SOF_TIMESTAMPING_RX_SOFTWARE = 1 << 3
+SOF_TIMESTAMPING_SOFTWARE = 1 << 4
+SOF_TIMESTAMPING_RAW_HARDWARE = 1 << 6
+TIMESTAMPING_FLAGS = (SOF_TIMESTAMPING_RX_HARDWARE | SOF_TIMESTAMPING_RX_SOFTWARE |
+                      SOF_TIMESTAMPING_SOFTWARE | SOF_TIMESTAMPING_RAW_HARDWARE)
+
+# struct scm_timestamping: software, (deprecated), raw hardware
+TIMESPECS = struct.Struct("@llllll")
+CAN_FRAME = struct.Struct("=IB3x8s")
+CAN_EFF_MASK = 0x1FFFFFFF
+
+
+def frame_timestamp(ancdata):
+    # (seconds, source) from SCM_TIMESTAMPING: raw hardware if the driver filled it in
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == SO_TIMESTAMPING and len(data) >= TIMESPECS.size:
+            sw_sec, sw_nsec, _, _, hw_sec, hw_nsec = TIMESPECS.unpack_from(data)
+            if hw_sec or hw_nsec:
+                return hw_sec + hw_nsec * 1e-9, "hardware"
+            if sw_sec or sw_nsec:
+                return sw_sec + sw_nsec * 1e-9, "kernel"
+    return time.time(), "user"
+
+
+class WireTap:
+    def __init__(self, channel, request_ids=(REQUEST_ID,), response_ids=(RESPONSE_ID,)):
+        self.request_ids = set(request_ids)
+        self.response_ids = set(response_ids)
+        self.sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+        filters = b"".join(struct.pack("=II", can_id, 0x7FF) for can_id in self.request_ids | self.response_ids)
+        self.sock.setsockopt(socket.SOL_CAN_RAW, socket.CAN_RAW_FILTER, filters)
+        self.sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPING, TIMESTAMPING_FLAGS)
+        self.sock.settimeout(0.5)
+        self.sock.bind((channel,))
+        self.ancillary_size = socket.CMSG_SPACE(TIMESPECS.size)
+        self.pending = {}      # pid -> (timestamp, source) of requests not answered yet
+        self.histograms = {}   # pid -> LatencyHistogram of wire turnaround
+        self.sources = {"hardware": 0, "kernel": 0, "user": 0}
+        self.unmatched = 0
+        self.mixed = 0         # pairs skipped because request and reply came from different clocks
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="wire-tap", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while self.running:
+            try:
+                frame, ancdata, _, _ = self.sock.recvmsg(CAN_FRAME.size, self.ancillary_size)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if len(frame) < CAN_FRAME.size:
+                continue
+            can_id, dlc, data = CAN_FRAME.unpack(frame)
+            timestamp, source = frame_timestamp(ancdata)
+            self.sources[source] += 1
+            self.on_frame(can_id & CAN_EFF_MASK, data[:dlc], timestamp, source)
+
+    def on_frame(self, can_id, data, timestamp, source):
+        if len(data) < 3:
+            return
+        if can_id in self.request_ids and data[1] == 0x01:
+            self.pending.setdefault(data[2], deque(maxlen=16)).append((timestamp, source))
+        elif can_id in self.response_ids and data[1] == 0x41:
+            waiting = self.pending.get(data[2])
+            if not waiting:
+                self.unmatched += 1
+                return
+            sent, sent_source = waiting.popleft()
+            if sent_source != source:
+                # hardware and kernel clocks are different domains, the difference means nothing
+                self.mixed += 1
+                return
+            histogram = self.histograms.get(data[2])
+            if histogram is None:
+                histogram = self.histograms[data[2]] = LatencyHistogram()
+            histogram.record(timestamp - sent)
+
+    def source(self):
+        # the timestamp source(s) seen so far, e.g. "hardware" or "hardware+kernel"
+        seen = [name for name in ("hardware", "kernel", "user") if self.sources[name]]
+        return "+".join(seen) or "none"
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        self.sock.close()